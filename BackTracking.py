@@ -1,6 +1,10 @@
+import argparse
 import copy
-from operator import itemgetter
+from collections import OrderedDict
+import os
+import pickle
 import timeit
+import zlib
 
 DIGITS = [1, 2, 3, 4, 5, 6, 7, 8, 9]
 
@@ -10,6 +14,46 @@ BLACK = -2
 DOWN = 'down'
 RIGHT = 'right'
 
+# digit d is stored as bit d of a mask, bit 0 is unused
+ALL_DIGITS = sum(1 << d for d in DIGITS)
+
+def digits_of(mask):
+    return [d for d in DIGITS if mask & (1 << d)]
+
+def build_combinations():
+    combinations = {}
+    for mask in range(2, 1 << 10, 2):
+        digits = digits_of(mask)
+        combinations.setdefault((sum(digits), len(digits)), []).append(mask)
+    return combinations
+
+# (goal_sum, length) -> every set of distinct digits with that sum, as masks
+COMBINATIONS = build_combinations()
+
+# (goal_sum, length) -> every digit that appears in one of its combinations
+CLUE_DIGITS = {}
+for key, masks in COMBINATIONS.items():
+    CLUE_DIGITS[key] = 0
+    for mask in masks:
+        CLUE_DIGITS[key] |= mask
+
+def build_sum_bounds():
+    bounds = []
+    for mask in range(1 << 10):
+        digits = digits_of(mask)
+        row = [(0, 0)]
+        for k in range(1, 10):
+            row.append((sum(digits[:k]), sum(digits[-k:])) if k <= len(digits) else None)
+        bounds.append(row)
+    return bounds
+
+# SUM_BOUNDS[available][k] is the (min, max) sum of k distinct digits from the mask, None if there are too few
+SUM_BOUNDS = build_sum_bounds()
+
+# ((goal_sum, length), (goal_sum, length)) -> digits possible where the two clues cross
+CROSSING_DIGITS = {(first, second): CLUE_DIGITS[first] & CLUE_DIGITS[second]
+                   for first in CLUE_DIGITS for second in CLUE_DIGITS}
+
 class KakuroCell:
     def __init__(self, location, category):
         self.location = location
@@ -22,6 +66,35 @@ class KakuroClue:
         self.goal_sum = goal_sum
         self.location = None
 
+class KakuroClueDigits:
+    # filled cells of one clue in one puzzle, their sum, the digits they use and how many of those repeat,
+    # kept up to date by the cells; clue objects can be shared between puzzles, so this lives on the puzzle
+    def __init__(self):
+        self.filled = 0
+        self.filled_sum = 0
+        self.used = 0
+        self.repeats = 0
+        self.digit_counts = [0] * 10
+
+    def replace_digit(self, old, new):
+        counts = self.digit_counts
+        if old:
+            counts[old] -= 1
+            if counts[old]:
+                self.repeats -= 1
+            else:
+                self.used &= ~(1 << old)
+            self.filled -= 1
+            self.filled_sum -= old
+        if new:
+            if counts[new]:
+                self.repeats += 1
+            else:
+                self.used |= 1 << new
+            counts[new] += 1
+            self.filled += 1
+            self.filled_sum += new
+
 class KakuroClueCell(KakuroCell):
     def __init__(self, location, down_clue, right_clue):
         super().__init__(location, category=CLUE)
@@ -38,19 +111,46 @@ class KakuroBlackCell(KakuroCell):
     def __init__(self, location):
         super().__init__(location, category=BLACK)
 
+class KakuroCellValue:
+    # only __set__ is defined, so reading cell.value finds the instance dict at plain attribute speed while
+    # every write, by the search or anyone else, updates the clues the cell belongs to
+    def __set__(self, cell, value):
+        state = cell.__dict__
+        old = state.get('value', 0)
+        state['value'] = value
+        if old != value:
+            for digits in cell.clue_digits:
+                digits.replace_digit(old, value)
+
 class KakuroWhiteCell(KakuroCell):
-    def __init__(self, location, value=0):
+    value = KakuroCellValue()
+
+    def __init__(self, location, value=0, given=True):
         super().__init__(location, category=WHITE)
+        # linked by the puzzle once the clues are known
+        self.clue_digits = ()
         self.value = value
+        # a value that is not given is a player's entry: it may be wrong and never narrows any domain
+        self.given = given
+        self.domain = ALL_DIGITS
 
 class KakuroPuzzle:
-    def __init__(self, height, width, cells):
+    def __init__(self, height, width, cells, verbose=True):
         self.height = height
         self.width = width
         self.cells = cells
         self.clues = self.create_clues()
         self.puzzle = self.create_puzzle()
-        self.print_puzzle()
+        self.derive_clue_lengths()
+        self.cell_clues = self.create_cell_clues()
+        self.check_white_cells()
+        self.givens = self.find_givens()
+        self.check_digits()
+        self.link_clues()
+        self.check_givens()
+        self.seed_domains()
+        if verbose:
+            self.print_puzzle()
 
     def print_puzzle(self):
         for i in range(self.height):
@@ -81,6 +181,138 @@ class KakuroPuzzle:
             puzzle[cell.location[0]][cell.location[1]] = cell
         return puzzle
 
+    def derive_clue_lengths(self):
+        # every clue walks its own white run once, a length given by hand has to agree with the layout
+        for clue in self.clues:
+            step_row, step_col = (1, 0) if clue.direction == DOWN else (0, 1)
+            row = clue.location[0] + step_row
+            col = clue.location[1] + step_col
+            length = 0
+            while row < self.height and col < self.width and self.puzzle[row][col].category == WHITE:
+                length += 1
+                row += step_row
+                col += step_col
+            if clue.length is None:
+                clue.length = length
+            elif clue.length != length:
+                raise ValueError("%s clue at %s has length %d but its run has %d cells"
+                                 % (clue.direction, clue.location, clue.length, length))
+            if not 1 <= length <= len(DIGITS):
+                raise ValueError("%s clue at %s heads a run of %d cells" % (clue.direction, clue.location, length))
+            # templates for the generator leave the sum open
+            if clue.goal_sum is not None and (clue.goal_sum, length) not in COMBINATIONS:
+                raise ValueError("%s clue at %s: no %d distinct digits sum to %d"
+                                 % (clue.direction, clue.location, length, clue.goal_sum))
+
+    def check_white_cells(self):
+        for row in self.puzzle:
+            for cell in row:
+                if cell.category == WHITE and cell.location not in self.cell_clues:
+                    raise ValueError("white cell at %s is not covered by any clue" % (cell.location,))
+
+    def create_cell_clues(self):
+        cell_clues = {}
+        for clue in self.clues:
+            for cell in self.get_cell_set(clue):
+                cell_clues.setdefault(cell.location, []).append(clue)
+        return cell_clues
+
+    def find_givens(self):
+        return {cell.location for row in self.puzzle for cell in row
+                if cell.category == WHITE and cell.value != 0 and cell.given}
+
+    def check_digits(self):
+        for row, col in self.cell_clues:
+            value = self.puzzle[row][col].value
+            if value != 0 and value not in DIGITS:
+                raise ValueError("value at %s is %r, not a digit" % ((row, col), value))
+
+    def link_clues(self):
+        # from here on every cell keeps the filled sum and digits of its clues current
+        self.clue_digits = {clue: KakuroClueDigits() for clue in self.clues}
+        for location, clues in self.cell_clues.items():
+            cell = self.puzzle[location[0]][location[1]]
+            cell.clue_digits = [self.clue_digits[clue] for clue in clues]
+            for digits in cell.clue_digits:
+                digits.replace_digit(0, cell.value)
+
+    def check_givens(self):
+        # entries may be wrong, that is for a session or a repair to find out, but the givens have to fit
+        for clue in self.clues:
+            if clue.goal_sum is not None and self.is_given_clue_violated(clue):
+                raise ValueError("the givens break the %s clue at %s" % (clue.direction, clue.location))
+
+    def is_given_clue_violated(self, clue):
+        values = [cell.value for cell in self.get_cell_set(clue) if cell.location in self.givens]
+        used = 0
+        for value in values:
+            if used & (1 << value):
+                return True
+            used |= 1 << value
+        bounds = SUM_BOUNDS[ALL_DIGITS & ~used][clue.length - len(values)]
+        return bounds is None or not bounds[0] <= clue.goal_sum - sum(values) <= bounds[1]
+
+    def seed_domains(self):
+        for location in self.cell_clues:
+            cell = self.puzzle[location[0]][location[1]]
+            if location in self.givens:
+                cell.domain = 1 << cell.value
+            else:
+                cell.domain = self.clue_only_domain(location)
+        self.propagate_givens()
+
+    def clue_only_domain(self, location):
+        # the digits the clues over the cell allow before any value is placed
+        keys = [(clue.goal_sum, clue.length) for clue in self.cell_clues[location]]
+        if len(keys) == 2:
+            return CROSSING_DIGITS.get((keys[0], keys[1]), 0)
+        return CLUE_DIGITS.get(keys[0], 0)
+
+    def propagate_givens(self):
+        # narrows the empty cells around the givens with the clue combinations until nothing changes
+        queue = [clue for clue in self.clues if clue.goal_sum is not None and
+                 any(cell.location in self.givens for cell in self.get_cell_set(clue))]
+        queued = set(queue)
+        while queue:
+            clue = queue.pop()
+            queued.discard(clue)
+            cell_set = self.get_cell_set(clue)
+            assigned = 0
+            empty = []
+            for cell in cell_set:
+                if cell.location in self.givens:
+                    assigned |= 1 << cell.value
+                else:
+                    empty.append(cell)
+            support = 0
+            for combination in COMBINATIONS.get((clue.goal_sum, clue.length), ()):
+                rest = combination & ~assigned
+                if combination & assigned == assigned and all(cell.domain & rest for cell in empty):
+                    support |= rest
+            for cell in empty:
+                domain = cell.domain & support
+                if domain == cell.domain:
+                    continue
+                if not domain:
+                    raise ValueError("the givens leave no digit for the cell at %s" % (cell.location,))
+                cell.domain = domain
+                for other in self.cell_clues[cell.location]:
+                    if other.goal_sum is not None and other not in queued:
+                        queued.add(other)
+                        queue.append(other)
+
+    def clue_domain(self, clue):
+        # digits still possible for the empty cells of the clue, as a mask
+        digits = self.clue_digits[clue]
+        if digits.repeats:
+            return 0
+        assigned = digits.used
+        domain = 0
+        for combination in COMBINATIONS.get((clue.goal_sum, clue.length), ()):
+            if combination & assigned == assigned:
+                domain |= combination
+        return domain & ~assigned
+
     def get_cell_set(self, clue):
         cell_set = []
         if clue.direction == DOWN:
@@ -103,12 +335,7 @@ class KakuroPuzzle:
         return self.clue_unassigned_count(clue) == 0
 
     def clue_unassigned_count(self, clue):
-        cell_set = self.get_cell_set(clue)
-        unassigned_count = 0
-        for cell in cell_set:
-            if cell.value == 0:
-                unassigned_count += 1
-        return unassigned_count
+        return clue.length - self.clue_digits[clue].filled
 
     def is_complete(self):
         for i in range(self.height):
@@ -119,64 +346,456 @@ class KakuroPuzzle:
 
     def is_consistent(self):
         for clue in self.clues:
-            cell_set = self.get_cell_set(clue)
-            if self.is_clue_assigned(clue):
-                current_sum = 0
-                values = []
-                for cell in cell_set:
-                    values.append(cell.value)
-                    current_sum += cell.value
-                if current_sum != clue.goal_sum or any(values.count(x) > 1 for x in values):
+            if self.is_clue_violated(clue):
+                return False
+        return True
+
+    def is_consistent_around(self, clue):
+        # enough after assigning one clue of a consistent puzzle: only the clue and its crossings changed
+        if self.is_clue_violated(clue):
+            return False
+        for cell in self.get_cell_set(clue):
+            for other in self.cell_clues.get(cell.location, ()):
+                if other is not clue and self.is_clue_violated(other):
                     return False
         return True
 
+    def clue_remaining(self, clue):
+        # remaining sum, remaining cell count and the digits not used yet, None for a repeated digit
+        digits = self.clue_digits[clue]
+        remaining_sum = clue.goal_sum - digits.filled_sum
+        remaining_count = clue.length - digits.filled
+        if digits.repeats:
+            return remaining_sum, remaining_count, None
+        return remaining_sum, remaining_count, ALL_DIGITS & ~digits.used
+
+    def is_clue_violated(self, clue):
+        remaining_sum, remaining_count, available = self.clue_remaining(clue)
+        if available is None:
+            return True
+        bounds = SUM_BOUNDS[available][remaining_count]
+        return bounds is None or not bounds[0] <= remaining_sum <= bounds[1]
+
+    def violated_clues(self):
+        return [clue for clue in self.clues if self.is_clue_violated(clue)]
+
+    def value_buffer(self):
+        return bytes(cell.value if cell.category == WHITE else 0 for row in self.puzzle for cell in row)
+
+    def search_key(self):
+        # what a learned nogood depends on: the clues and the values filled before the search
+        clues = tuple((clue.location, clue.direction, clue.length, clue.goal_sum) for clue in self.clues)
+        return self.height, self.width, clues, self.value_buffer()
+
+    def load_value_buffer(self, buffer):
+        for i in range(self.height):
+            for j in range(self.width):
+                cell = self.puzzle[i][j]
+                if cell.category == WHITE:
+                    cell.value = buffer[i * self.width + j]
+
+class KakuroNogoodStore:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.nogoods = OrderedDict()
+        self.watches = {}
+        self.lookups = 0
+        self.hits = 0
+        # the puzzle the nogoods were learned on, they prove nothing about any other
+        self.key = None
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def bind(self, key):
+        if key != self.key:
+            self.nogoods.clear()
+            self.watches.clear()
+            self.key = key
+
+    def add(self, nogood):
+        if not nogood or self.capacity <= 0 or nogood in self.nogoods:
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.watches.setdefault(pair, set()).add(nogood)
+        if len(self.nogoods) > self.capacity:
+            oldest, _ = self.nogoods.popitem(last=False)
+            for pair in oldest:
+                watching = self.watches[pair]
+                watching.discard(oldest)
+                if not watching:
+                    del self.watches[pair]
+
+    def find(self, assignment, locations):
+        # only nogoods that mention one of the newly assigned cells can have become true
+        self.lookups += 1
+        for location in locations:
+            value = assignment.puzzle[location[0]][location[1]].value
+            for nogood in self.watches.get((location, value), ()):
+                if all(assignment.puzzle[i][j].value == v for (i, j), v in nogood):
+                    self.hits += 1
+                    self.nogoods.move_to_end(nogood)
+                    return nogood
+        return None
+
+SOLVED = 'solved'
+EXHAUSTED = 'exhausted'
+PAUSED = 'paused'
+
+class KakuroSearchFrame:
+    def __init__(self, clue, new_cells, value_sets, mark, conflict_set, seed=None):
+        self.clue = clue
+        self.new_cells = new_cells
+        self.value_sets = value_sets
+        self.mark = mark
+        self.conflict_set = conflict_set
+        # what the agent drew to order this frame's value sets, None for an agent with a fixed order
+        self.seed = seed
+        self.found = False
+        self.child_active = False
+        self.tried = 0
+        # limited discrepancy search: discrepancies taken above this frame, children entered so far and
+        # whether a value set was skipped for exceeding the limit somewhere in the subtree
+        self.discrepancies = 0
+        self.children = 0
+        self.cut = False
+
+class KakuroSearch:
+    def __init__(self, agent, assignment, prepare=True):
+        self.agent = agent
+        self.assignment = assignment
+        self.stack = []
+        self.trail = []
+        # conflict-directed backjumping: owners maps every assigned cell to the depth of the clue that
+        # assigned it, and conflict_set holds the depths responsible for the last failure
+        self.owners = {}
+        self.conflict_set = set()
+        self.entering = True
+        self.checkpoint_path = None
+        self.checkpoint_interval = 60.0
+        self.last_checkpoint = timeit.default_timer()
+        self.status = None
+        self.max_discrepancies = None
+        self.deadline = None
+        self.cut = False
+        # optional recorder with push, try_value_set, prune, backtrack and solved hooks
+        self.trace = None
+        # set when the puzzle is shown to have no solution before the search starts
+        self.failed = False
+        # cells empty when the trail is, the assignment is complete once the trail holds them all
+        self.open_cells = 0
+        if prepare:
+            self.prepare()
+
+    def prepare(self):
+        agent = self.agent
+        assignment = self.assignment
+        # an agent reused on another puzzle starts over, a restart on the same puzzle keeps what it learned
+        agent.nogoods.bind(assignment.search_key())
+        if agent.rules is not None:
+            # the rules only narrow the root domains, below the root the search keeps to its own clue checks, a
+            # session or a decomposition is the place for rules that run after every entry
+            # imported here because Propagation imports this module
+            from Propagation import KakuroConstraints, KakuroPropagator
+            constraints = KakuroConstraints(assignment)
+            propagator = KakuroPropagator(constraints, rules=agent.rules)
+            if not propagator.propagate():
+                self.failed = True
+                return
+            for (row, col), mask in zip(constraints.cells, propagator.domains):
+                assignment.puzzle[row][col].domain = mask
+        # cells whose domain holds a single digit are decided before the search and never become variables
+        seeded = set()
+        for row, col in assignment.cell_clues:
+            cell = assignment.puzzle[row][col]
+            if cell.value == 0 and cell.domain and not cell.domain & (cell.domain - 1):
+                cell.value = cell.domain.bit_length() - 1
+                seeded.update(assignment.cell_clues[(row, col)])
+            elif cell.value == 0:
+                self.open_cells += 1
+        # two decided cells can still break a clue together, then there is nothing to search
+        if any(assignment.is_clue_violated(clue) for clue in seeded):
+            self.failed = True
+
+    def undo(self, mark):
+        trail = self.trail
+        while len(trail) > mark:
+            trail.pop().value = 0
+
+    def run(self, max_nodes=None):
+        self.status = self.explore(max_nodes)
+        return self.status
+
+    def explore(self, max_nodes):
+        agent = self.agent
+        assignment = self.assignment
+        stack = self.stack
+        node_budget = None if max_nodes is None else agent.nodes + max_nodes
+        if self.failed:
+            return EXHAUSTED
+
+        while True:
+            if self.entering:
+                if node_budget is not None and agent.nodes >= node_budget:
+                    return PAUSED
+                if self.deadline is not None and timeit.default_timer() >= self.deadline:
+                    return PAUSED
+                if self.checkpoint_path is not None and \
+                        timeit.default_timer() - self.last_checkpoint >= self.checkpoint_interval:
+                    self.save_checkpoint(self.checkpoint_path)
+                self.entering = False
+                agent.nodes += 1
+                depth = len(stack)
+                # every search write goes through the trail, so counting it stands in for scanning the grid
+                if len(self.trail) == self.open_cells and assignment.is_consistent():
+                    self.conflict_set = set(range(depth))
+                    for frame in stack:
+                        frame.found = True
+                    if self.trace is not None:
+                        self.trace.solved(depth)
+                    return SOLVED
+
+                clue = agent.select_unassigned_clue(assignment)
+                if clue is None:
+                    self.conflict_set = set(range(depth))
+                else:
+                    cell_set = assignment.get_cell_set(clue)
+                    new_cells = [cell for cell in cell_set if cell.value == 0]
+                    # cells filled before the search have no owner and never take part in a conflict
+                    conflict_set = {self.owners[cell.location] for cell in cell_set if cell.location in self.owners}
+                    # the value sets are filtered by the crossing clues, so their owners share the blame
+                    for cell in new_cells:
+                        for other in assignment.cell_clues.get(cell.location, ()):
+                            if other is not clue:
+                                conflict_set.update(self.owners[crossing.location]
+                                                    for crossing in assignment.get_cell_set(other)
+                                                    if crossing.location in self.owners)
+                    seed = agent.frame_seed()
+                    value_sets = iter(agent.frame_values(clue, cell_set, assignment, seed))
+                    frame = KakuroSearchFrame(clue, new_cells, value_sets, len(self.trail), conflict_set, seed)
+                    if stack:
+                        parent = stack[-1]
+                        frame.discrepancies = parent.discrepancies + (parent.children > 1)
+                    stack.append(frame)
+                    if self.trace is not None:
+                        self.trace.push(depth, clue)
+
+            if not stack:
+                return EXHAUSTED
+
+            frame = stack[-1]
+            depth = len(stack) - 1
+            if frame.child_active:
+                frame.child_active = False
+                for cell in frame.new_cells:
+                    del self.owners[cell.location]
+                self.undo(frame.mark)
+                if self.cut:
+                    frame.cut = True
+                if depth not in self.conflict_set:
+                    # nothing below depended on this clue, so its other value sets cannot help either
+                    if self.trace is not None:
+                        self.trace.backtrack(depth, frame.clue, 'backjump')
+                    stack.pop()
+                    continue
+                frame.conflict_set |= self.conflict_set
+
+            if self.advance(frame, depth):
+                self.entering = True
+                continue
+
+            if frame.cut:
+                # a subtree cut by the discrepancy limit proves nothing, so backtrack chronologically
+                frame.conflict_set = set(range(depth + 1))
+            frame.conflict_set.discard(depth)
+            if not frame.found and not frame.cut:
+                self.agent.nogoods.add(frozenset((location, assignment.puzzle[location[0]][location[1]].value)
+                                                 for location, owner in self.owners.items()
+                                                 if owner in frame.conflict_set))
+            self.conflict_set = frame.conflict_set
+            self.cut = frame.cut
+            if self.trace is not None:
+                self.trace.backtrack(depth, frame.clue, 'exhausted')
+            stack.pop()
+
+    def advance(self, frame, depth):
+        agent = self.agent
+        assignment = self.assignment
+        new_locations = [cell.location for cell in frame.new_cells]
+        for value_set in frame.value_sets:
+            frame.tried += 1
+            consistent = agent.is_consistent(frame.clue, value_set, assignment)
+            self.trail.extend(frame.new_cells)
+            if not consistent:
+                for violated in assignment.violated_clues():
+                    frame.conflict_set.update(self.owners.get(cell.location, depth)
+                                              for cell in assignment.get_cell_set(violated))
+                self.undo(frame.mark)
+                if self.trace is not None:
+                    self.trace.prune(depth, frame.clue, frame.tried, 'violation')
+                continue
+            nogood = agent.nogoods.find(assignment, new_locations)
+            if nogood is not None:
+                frame.conflict_set.update(self.owners.get(location, depth) for location, _ in nogood)
+                self.undo(frame.mark)
+                if self.trace is not None:
+                    self.trace.prune(depth, frame.clue, frame.tried, 'nogood')
+                continue
+            if self.max_discrepancies is not None and frame.children and \
+                    frame.discrepancies >= self.max_discrepancies:
+                # every other child would be one discrepancy too many
+                frame.cut = True
+                self.undo(frame.mark)
+                if self.trace is not None:
+                    self.trace.prune(depth, frame.clue, frame.tried, 'discrepancy')
+                return False
+
+            frame.children += 1
+            if self.trace is not None:
+                self.trace.try_value_set(depth, frame.clue, frame.tried)
+            for location in new_locations:
+                self.owners[location] = depth
+            frame.child_active = True
+            return True
+        return False
+
+    def save_checkpoint(self, path):
+        # value set iterators cannot be pickled, a frame keeps its seed and how many it has tried and is replayed
+        # on load
+        frames = []
+        for frame in self.stack:
+            frames.append((frame.clue, frame.new_cells, frame.mark, frame.tried, frame.conflict_set, frame.found,
+                           frame.child_active, frame.discrepancies, frame.children, frame.cut, frame.seed))
+        state = {
+            'agent': self.agent,
+            'assignment': self.assignment,
+            'trail': self.trail,
+            'frames': frames,
+            'owners': self.owners,
+            'conflict_set': self.conflict_set,
+            'entering': self.entering,
+            'checkpoint_interval': self.checkpoint_interval,
+            'max_discrepancies': self.max_discrepancies,
+            'cut': self.cut,
+        }
+        data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as checkpoint_file:
+            checkpoint_file.write(data)
+        os.replace(temporary_path, path)
+        self.last_checkpoint = timeit.default_timer()
+
+    @staticmethod
+    def load_checkpoint(path):
+        with open(path, 'rb') as checkpoint_file:
+            state = pickle.loads(zlib.decompress(checkpoint_file.read()))
+        agent = state['agent']
+        assignment = state['assignment']
+        search = KakuroSearch(agent, assignment, prepare=False)
+        search.owners = state['owners']
+        search.conflict_set = state['conflict_set']
+        search.entering = state['entering']
+        search.checkpoint_path = path
+        search.checkpoint_interval = state['checkpoint_interval']
+        search.max_discrepancies = state['max_discrepancies']
+        search.cut = state['cut']
+
+        # rebuild each frame's value sets from the assignment as it was when the frame was pushed
+        trail = state['trail']
+        values = [cell.value for cell in trail]
+        for cell in trail:
+            cell.value = 0
+        applied = 0
+        for clue, new_cells, mark, tried, conflict_set, found, child_active, discrepancies, children, cut, \
+                seed in state['frames']:
+            while applied < mark:
+                trail[applied].value = values[applied]
+                applied += 1
+            value_sets = iter(agent.frame_values(clue, assignment.get_cell_set(clue), assignment, seed))
+            for _ in range(tried):
+                next(value_sets)
+            frame = KakuroSearchFrame(clue, new_cells, value_sets, mark, conflict_set, seed)
+            frame.tried = tried
+            frame.found = found
+            frame.child_active = child_active
+            frame.discrepancies = discrepancies
+            frame.children = children
+            frame.cut = cut
+            search.stack.append(frame)
+        while applied < len(trail):
+            trail[applied].value = values[applied]
+            applied += 1
+        search.trail = trail
+        search.open_cells = len(trail) + sum(1 for row, col in assignment.cell_clues
+                                             if assignment.puzzle[row][col].value == 0)
+        return search
+
 class KakuroAgent:
-    def __init__(self, puzzle):
+    max_nogoods = 10000
+
+    def __init__(self, puzzle, verbose=True, rules=None):
         self.puzzle = puzzle
+        self.verbose = verbose
+        self.nodes = 0
+        self.nogoods = KakuroNogoodStore(self.max_nogoods)
+        # propagation rules run once over the root domains before each search, not at the nodes of the search,
+        # None leaves the seeded domains alone
+        self.rules = rules
 
     def solve(self):
         solution = self.backtracking_search(self.puzzle)
         if solution is not None:
-            solution.print_puzzle()
+            if self.verbose:
+                solution.print_puzzle()
             self.puzzle = solution
-        else:
+        elif self.verbose:
             print("no solution found")
 
     def backtracking_search(self, puzzle):
         return self.recursive_backtracking(copy.deepcopy(puzzle))
 
     def recursive_backtracking(self, assignment):
-        if assignment.is_complete() and assignment.is_consistent():
-            print("Puzzle solved!")
+        # kept under its old name, the search itself runs on the explicit stack of KakuroSearch
+        if KakuroSearch(self, assignment).run() == SOLVED:
+            if self.verbose:
+                print("Puzzle solved!")
             return assignment
+        return None
+
+    def iter_backtracking(self, assignment):
+        # the assignment is updated in place, copy a solution before resuming the generator
+        search = KakuroSearch(self, assignment)
+        while search.run() == SOLVED:
+            yield assignment
 
-        clue = self.select_unassigned_clue(assignment)
-        if clue is not None:
-            cell_set = assignment.get_cell_set(clue)
-            value_sets = self.order_domain_values(clue, cell_set, assignment)
-            for value_set in value_sets:
-                if self.is_consistent(clue, copy.deepcopy(value_set), copy.deepcopy(assignment)):
-                    assignment.assign_clue(clue, value_set)
-                    assignment.print_puzzle()
-                    result = self.recursive_backtracking(copy.deepcopy(assignment))
-                    if result is not None:
-                        return result
-            return None
+    def checkpointed_search(self, puzzle, checkpoint_path, checkpoint_interval=60.0):
+        search = KakuroSearch(self, copy.deepcopy(puzzle))
+        search.checkpoint_path = checkpoint_path
+        search.checkpoint_interval = checkpoint_interval
+        return search
 
     def select_unassigned_clue(self, assignment):
         for clue in assignment.clues:
             if not assignment.is_clue_assigned(clue):
                 return clue
 
-    def order_domain_values(self, clue, cell_set, assignment):
-        value_sets = []
+    def frame_seed(self):
+        # order_domain_values gives the same order for the same assignment, so a frame needs no seed to be replayed
+        return None
+
+    def frame_values(self, clue, cell_set, assignment, seed):
+        # the value sets of one search frame, from the seed frame_seed drew when the frame was pushed
+        return self.order_domain_values(clue, cell_set, assignment)
+
+    def order_domain_values(self, clue, cell_set, assignment, rng=None):
         assigned_cells = []
-        unassigned_cells = []
+        unassigned_positions = []
         allowed_values = copy.deepcopy(DIGITS)
 
-        for cell in cell_set:
+        for position, cell in enumerate(cell_set):
             if cell.value == 0:
-                unassigned_cells.append(cell)
+                unassigned_positions.append(position)
             else:
                 if cell.value in allowed_values:
                     allowed_values.remove(cell.value)
@@ -186,73 +805,88 @@ class KakuroAgent:
         for cell in assigned_cells:
             current_sum += cell.value
 
+        # each empty cell can only take digits its crossing clue still allows
+        domains = []
+        for position in unassigned_positions:
+            domain = cell_set[position].domain
+            for other in assignment.cell_clues.get(cell_set[position].location, ()):
+                if other is not clue:
+                    domain &= assignment.clue_domain(other)
+            domains.append(domain)
+
         net_goal_sum = clue.goal_sum - current_sum
         net_cell_count = clue.length - len(assigned_cells)
-        unassigned_value_sets = self.sum_to_n(net_goal_sum, net_cell_count, allowed_values)
-
-        for unassigned_value_set in unassigned_value_sets:
-            variable_set = copy.deepcopy(cell_set)
-            value_set = []
-            for cell in variable_set:
-                if cell.value == 0:
-                    value_set.append(unassigned_value_set.pop(0))
-                else:
-                    value_set.append(cell.value)
-            value_sets.append(value_set)
-
-        return value_sets
-
-    def sum_to_n(self, n, k, allowed_values):
-        if k == 1 and n in allowed_values:
-            return [[n]]
+        base_values = [cell.value for cell in cell_set]
+        for unassigned_value_set in self.sum_to_n(net_goal_sum, net_cell_count, allowed_values, domains, rng):
+            value_set = list(base_values)
+            for position, value in zip(unassigned_positions, unassigned_value_set):
+                value_set[position] = value
+            yield value_set
+
+    def sum_to_n(self, n, k, allowed_values, domains=None, rng=None):
+        # yields the ordered lists of k distinct allowed values summing to n, domains[i] masks position i, an rng
+        # shuffles the candidates at every position, which randomizes the order without materializing it
+        if rng is not None:
+            allowed_values = list(allowed_values)
+            rng.shuffle(allowed_values)
+        if k == 1:
+            if n in allowed_values and (domains is None or domains[0] & (1 << n)):
+                yield [n]
+            return
 
-        combos = []
         for i in allowed_values:
-            allowed_values_copy = copy.deepcopy(allowed_values)
-            allowed_values_copy.remove(i)
-            if n - i > 0:
-                combos += [[i] + combo for combo in self.sum_to_n(n - i, k - 1, allowed_values_copy)]
-
-        for combo in combos[:]:
-            if any(combo.count(x) > 1 for x in combo):
-                combos.remove(combo)
-
-        return combos
+            if n - i <= 0 or (domains is not None and not domains[0] & (1 << i)):
+                continue
+            allowed_values_copy = [value for value in allowed_values if value != i]
+            available = 0
+            for value in allowed_values_copy:
+                available |= 1 << value
+            bounds = SUM_BOUNDS[available][k - 1]
+            if bounds is None or not bounds[0] <= n - i <= bounds[1]:
+                continue
+            for combo in self.sum_to_n(n - i, k - 1, allowed_values_copy, domains[1:] if domains is not None else None,
+                                       rng):
+                yield [i] + combo
 
     def is_consistent(self, clue, value_set, assignment):
         assignment.assign_clue(clue, value_set)
-        assignment.print_puzzle()
-        return assignment.is_consistent()
+        if self.verbose:
+            assignment.print_puzzle()
+        return assignment.is_consistent_around(clue)
 
 class IntelligentKakuroAgent(KakuroAgent):
-    def __init__(self, puzzle):
-        super().__init__(puzzle)
+    def __init__(self, puzzle, verbose=True, rules=None):
+        super().__init__(puzzle, verbose, rules)
 
     def select_unassigned_clue(self, assignment):
-        clue_list = []
-        partial_assigned_list = []
-        unassigned_list = []
+        # partly assigned clues before untouched ones, fewest empty cells first and clue order among equals, one
+        # pass keeps the first best instead of sorting every clue at every node
+        best = None
+        best_key = None
         for clue in assignment.clues:
-            if not assignment.is_clue_assigned(clue):
-                unassigned_count = assignment.clue_unassigned_count(clue)
-                if unassigned_count == clue.length:
-                    unassigned_list.append((clue, unassigned_count))
-                else:
-                    partial_assigned_list.append((clue, unassigned_count))
-        unassigned_list.sort(key=itemgetter(1))
-        partial_assigned_list.sort(key=itemgetter(1))
-        clue_list = partial_assigned_list + unassigned_list
-        return clue_list[0][0]
-
-if __name__ == "__main__":
-    print("Choose a puzzle to solve:")
-    print("1. 8x8 puzzle(Easy)")
-    print("2. 8x8 puzzle(Medium)")
-    print("3. 10x10 puzzle(Hard)")
-    print("4. 10x10 puzzle(Expert)")
-
-    choice = input("Enter your choice (1 to 4): ")
-
+            unassigned_count = assignment.clue_unassigned_count(clue)
+            if unassigned_count:
+                key = (unassigned_count == clue.length, unassigned_count)
+                if best_key is None or key < best_key:
+                    best = clue
+                    best_key = key
+        return best
+
+def resume(checkpoint_path, max_nodes=None):
+    # continues a checkpointed search until it solves, exhausts or uses up max_nodes
+    search = KakuroSearch.load_checkpoint(checkpoint_path)
+    search.run(max_nodes)
+    return search
+
+def iter_solutions(puzzle, agent_class=None, rules=None):
+    # yields each solution as soon as it is found, as a row-major bytes buffer of the cell values
+    agent = (agent_class or IntelligentKakuroAgent)(puzzle, verbose=False, rules=rules)
+    for solution in agent.iter_backtracking(copy.deepcopy(puzzle)):
+        yield solution.value_buffer()
+
+def sample_puzzle(choice, verbose=True):
+    # the sample boards of the command line, None for an unknown choice
+    choice = str(choice)
     if choice == "1":
         cells = []
         # 8x8 sample:
@@ -304,7 +938,7 @@ if __name__ == "__main__":
         cells.append(KakuroBlackCell((7, 7)))
 
         # create the puzzle
-        puzzle = KakuroPuzzle(8, 8, cells)
+        puzzle = KakuroPuzzle(8, 8, cells, verbose)
         
     elif choice == "2":
         cells = []
@@ -355,7 +989,7 @@ if __name__ == "__main__":
         cells.append(KakuroBlackCell((7, 7)))
 
         # create the puzzle
-        puzzle = KakuroPuzzle(8, 8, cells)
+        puzzle = KakuroPuzzle(8, 8, cells, verbose)
 
     elif choice == "3":
         cells = []
@@ -438,7 +1072,7 @@ if __name__ == "__main__":
         cells.append(KakuroClueCell((9, 7), None, KakuroClue(RIGHT, 2, 4)))
 
         # create the puzzle
-        puzzle = KakuroPuzzle(10, 10, cells)
+        puzzle = KakuroPuzzle(10, 10, cells, verbose)
 
     elif choice == "4":
         cells = []
@@ -510,11 +1144,44 @@ if __name__ == "__main__":
         cells.append(KakuroBlackCell((9, 9)))
 
         # create the puzzle
-        puzzle = KakuroPuzzle(10, 10, cells)
+        puzzle = KakuroPuzzle(10, 10, cells, verbose)
     else:
+        return None
+    return puzzle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve one of the sample Kakuro boards.")
+    parser.add_argument("--board", choices=["1", "2", "3", "4"], help="sample board, asked for when left out")
+    parser.add_argument("--profile", action="store_true",
+                        help="solve under cProfile and tracemalloc and write the profile files")
+    parser.add_argument("--agent", default="intelligent", help="agent used by --profile")
+    parser.add_argument("--output", default="kakuro-profile", help="file name prefix used by --profile")
+    parser.add_argument("--top", type=int, default=20, help="rows per table in the --profile summary")
+    args = parser.parse_args()
+
+    choice = args.board
+    if choice is None:
+        print("Choose a puzzle to solve:")
+        print("1. 8x8 puzzle(Easy)")
+        print("2. 8x8 puzzle(Medium)")
+        print("3. 10x10 puzzle(Hard)")
+        print("4. 10x10 puzzle(Expert)")
+
+        choice = input("Enter your choice (1 to 4): ")
+
+    puzzle = sample_puzzle(choice)
+    if puzzle is None:
         print("Invalid choice. Exiting.")
         exit()
 
+    if args.profile:
+        # imported here because Profiling imports this module
+        import Profiling
+        if args.agent not in Profiling.AGENTS:
+            parser.error("unknown agent %s, choose from %s" % (args.agent, ", ".join(sorted(Profiling.AGENTS))))
+        Profiling.profile_solve(puzzle, Profiling.AGENTS[args.agent], args.output, args.top)
+        exit()
+
     intelligent_agent = IntelligentKakuroAgent(copy.deepcopy(puzzle))
     intelligent_start = timeit.default_timer()
     intelligent_agent.solve()
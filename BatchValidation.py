@@ -0,0 +1,110 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from BackTracking import WHITE
+
+
+def grid_values(puzzle):
+    return [[cell.value if cell.category == WHITE else 0 for cell in row] for row in puzzle.puzzle]
+
+
+class KakuroBatchValidator:
+    def __init__(self, puzzle, use_numpy=None):
+        self.height = puzzle.height
+        self.width = puzzle.width
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("numpy is required for use_numpy=True")
+
+        self.runs = []
+        white = set()
+        for clue in puzzle.clues:
+            indices = [row * self.width + col for row, col in (cell.location for cell in puzzle.get_cell_set(clue))]
+            self.runs.append((indices, clue.goal_sum))
+            white.update(indices)
+        self.white = sorted(white)
+
+        if self.use_numpy:
+            by_length = {}
+            for indices, goal_sum in self.runs:
+                by_length.setdefault(len(indices), []).append((indices, goal_sum))
+            # one (clues, length) index array per run length so each group is a single fancy-index
+            self.groups = []
+            for length, runs in sorted(by_length.items()):
+                index = np.array([indices for indices, _ in runs], dtype=np.intp)
+                goals = np.array([goal_sum for _, goal_sum in runs], dtype=np.uint16)
+                self.groups.append((length, index, goals))
+            self.white_index = np.array(self.white, dtype=np.intp)
+
+    def flatten(self, solution):
+        # a puzzle, a grid of rows or one flat row-major sequence, bytes are passed through untouched
+        if isinstance(solution, (bytes, bytearray, memoryview)):
+            return solution
+        if hasattr(solution, "puzzle"):
+            solution = grid_values(solution)
+        solution = list(solution)
+        if solution and hasattr(solution[0], "__iter__"):
+            return [value for row in solution for value in row]
+        return solution
+
+    def pack(self, solutions):
+        size = self.height * self.width
+        if np is not None and isinstance(solutions, np.ndarray):
+            packed = solutions.reshape(-1, self.height, self.width)
+            if packed.dtype != np.uint8:
+                # values a uint8 cannot hold would wrap around into digits, they become 0 and fail like empty cells
+                packed = np.where((packed < 0) | (packed > 9), 0, packed).astype(np.uint8)
+            return packed
+        solutions = list(solutions)
+        packed = np.empty((len(solutions), size), dtype=np.uint8)
+        for k, solution in enumerate(solutions):
+            flat = self.flatten(solution)
+            if isinstance(flat, (bytes, bytearray, memoryview)):
+                packed[k] = np.frombuffer(flat, dtype=np.uint8, count=size)
+            else:
+                packed[k] = [value if 0 <= value <= 9 else 0 for value in flat]
+        return packed.reshape(-1, self.height, self.width)
+
+    def validate(self, solutions, chunk_size=65536):
+        # a list of booleans in the order of the solutions, whichever backend checked them
+        if not self.use_numpy:
+            return [self.is_valid(solution) for solution in solutions]
+
+        if not isinstance(solutions, np.ndarray):
+            solutions = list(solutions)
+        results = []
+        for start in range(0, len(solutions), chunk_size):
+            results.extend(self.validate_packed(self.pack(solutions[start:start + chunk_size])).tolist())
+        return results
+
+    def validate_packed(self, packed):
+        flat = packed.reshape(len(packed), -1)
+        cells = flat[:, self.white_index]
+        valid = ((cells >= 1) & (cells <= 9)).all(axis=1)
+        for length, index, goals in self.groups:
+            values = flat[:, index]
+            valid &= (values.sum(axis=2, dtype=np.uint16) == goals).all(axis=1)
+            if length > 1:
+                ordered = np.sort(values, axis=2)
+                valid &= (ordered[:, :, 1:] != ordered[:, :, :-1]).all(axis=(1, 2))
+        return valid
+
+    def is_valid(self, solution):
+        values = self.flatten(solution)
+        for index in self.white:
+            if not 1 <= values[index] <= 9:
+                return False
+        for indices, goal_sum in self.runs:
+            seen = 0
+            total = 0
+            for index in indices:
+                bit = 1 << values[index]
+                if seen & bit:
+                    return False
+                seen |= bit
+                total += values[index]
+            if total != goal_sum:
+                return False
+        return True
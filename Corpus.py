@@ -0,0 +1,371 @@
+import mmap
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory, util
+
+from BackTracking import CLUE, DOWN, RIGHT, WHITE, IntelligentKakuroAgent, KakuroBlackCell, KakuroClue, \
+    KakuroClueCell, KakuroPuzzle, KakuroWhiteCell
+
+# a record is height, width and five bytes per cell in row-major order:
+# white (0, given, 0, 0, 0), clue (1, down sum, down length, right sum, right length), black (2, 0, 0, 0, 0)
+CELL_SIZE = 5
+WHITE_KIND = 0
+CLUE_KIND = 1
+BLACK_KIND = 2
+
+GIVENS_FLAG = 1
+
+FILE_MAGIC = b'KKRC'
+FILE_VERSION = 1
+# magic, version, puzzle count and the position of the offset table
+FILE_HEADER = struct.Struct('<4sBQQ')
+FILE_OFFSET = struct.Struct('<Q')
+FILE_OFFSETS = struct.Struct('<QQ')
+
+PENDING = 0
+SOLVED = 1
+UNSOLVABLE = 2
+FAILED = 3
+
+
+def given_value(puzzle, cell):
+    # a corpus holds puzzles, a player's entry or a digit the search filled in is not written
+    return cell.value if cell.location in puzzle.givens else 0
+
+
+def encode_puzzle(puzzle):
+    record = bytearray((puzzle.height, puzzle.width))
+    for row in puzzle.puzzle:
+        for cell in row:
+            if cell.category == WHITE:
+                record += bytes((WHITE_KIND, given_value(puzzle, cell), 0, 0, 0))
+            elif cell.category == CLUE:
+                down = cell.down_clue
+                right = cell.right_clue
+                # an open template sum goes in as 0, like a missing clue
+                record += bytes((CLUE_KIND,
+                                 (down.goal_sum or 0) if down else 0, down.length if down else 0,
+                                 (right.goal_sum or 0) if right else 0, right.length if right else 0))
+            else:
+                record += bytes((BLACK_KIND, 0, 0, 0, 0))
+    return record
+
+
+def decode_puzzle(record):
+    height, width = record[0], record[1]
+    cells = []
+    for index in range(height * width):
+        start = 2 + index * CELL_SIZE
+        kind, first, second, third, fourth = record[start:start + CELL_SIZE]
+        location = divmod(index, width)
+        if kind == CLUE_KIND:
+            cells.append(KakuroClueCell(location,
+                                        KakuroClue(DOWN, second, first or None) if second else None,
+                                        KakuroClue(RIGHT, fourth, third or None) if fourth else None))
+        elif kind == BLACK_KIND:
+            cells.append(KakuroBlackCell(location))
+        elif first:
+            # givens go in with the cells, so the puzzle validates and propagates them like any other board
+            cells.append(KakuroWhiteCell(location, first))
+    return KakuroPuzzle(height, width, cells, verbose=False)
+
+
+def build_record(height, width, kinds, clues, values):
+    # height, width and flags, then a bit stream: two bits per cell category in row-major order, a 6-bit sum
+    # (0 for a template clue without one) and a 4-bit length (0 when absent) for the down and right clue of
+    # every clue cell, and with the givens flag a 4-bit value per white cell
+    flags = GIVENS_FLAG if any(values) else 0
+    bits = 0
+    position = 0
+    for kind in kinds:
+        bits |= kind << position
+        position += 2
+    for down, right in clues:
+        bits |= (down | right << 10) << position
+        position += 20
+    if flags & GIVENS_FLAG:
+        for value in values:
+            bits |= value << position
+            position += 4
+    return bytes((height, width, flags)) + bits.to_bytes((position + 7) // 8, 'little')
+
+
+def parse_record(record):
+    # the inverse of build_record, clues are (down, right) pairs of sum | length << 6
+    height, width, flags = record[0], record[1], record[2]
+    bits = int.from_bytes(record[3:], 'little')
+    size = height * width
+    kinds = [(bits >> (2 * index)) & 3 for index in range(size)]
+    bits >>= 2 * size
+    clues = []
+    for _ in range(kinds.count(CLUE_KIND)):
+        clues.append((bits & 1023, (bits >> 10) & 1023))
+        bits >>= 20
+    values = []
+    for _ in range(kinds.count(WHITE_KIND)):
+        values.append(bits & 15 if flags & GIVENS_FLAG else 0)
+        bits >>= 4
+    return height, width, kinds, clues, values
+
+
+def clue_bits(clue):
+    # no clue has a sum of 0, so it stands for the open sum of a template
+    return (clue.goal_sum or 0) | clue.length << 6 if clue else 0
+
+
+def pack_puzzle(puzzle):
+    kinds = []
+    clues = []
+    values = []
+    for row in puzzle.puzzle:
+        for cell in row:
+            if cell.category == WHITE:
+                kinds.append(WHITE_KIND)
+                values.append(given_value(puzzle, cell))
+            elif cell.category == CLUE:
+                kinds.append(CLUE_KIND)
+                clues.append((clue_bits(cell.down_clue), clue_bits(cell.right_clue)))
+            else:
+                kinds.append(BLACK_KIND)
+    return build_record(puzzle.height, puzzle.width, kinds, clues, values)
+
+
+def unpack_puzzle(record):
+    height, width, kinds, clues, values = parse_record(record)
+    clues = iter(clues)
+    values = iter(values)
+    cells = []
+    for index, kind in enumerate(kinds):
+        location = divmod(index, width)
+        if kind == CLUE_KIND:
+            down, right = next(clues)
+            cells.append(KakuroClueCell(location,
+                                        KakuroClue(DOWN, down >> 6, (down & 63) or None) if down else None,
+                                        KakuroClue(RIGHT, right >> 6, (right & 63) or None) if right else None))
+        elif kind == BLACK_KIND:
+            cells.append(KakuroBlackCell(location))
+        else:
+            value = next(values)
+            if value:
+                cells.append(KakuroWhiteCell(location, value))
+    return KakuroPuzzle(height, width, cells, verbose=False)
+
+
+class KakuroCorpusWriter:
+    # header, the packed records and then the offset table, whose position is patched into the header on close
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.offsets = array('Q', [FILE_HEADER.size])
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0, 0))
+
+    def add(self, puzzle):
+        self.add_record(pack_puzzle(puzzle))
+
+    def add_record(self, record):
+        self.file.write(record)
+        self.offsets.append(self.offsets[-1] + len(record))
+
+    def close(self):
+        table_offset = self.offsets[-1]
+        for offset in self.offsets:
+            self.file.write(FILE_OFFSET.pack(offset))
+        self.file.seek(0)
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self.offsets) - 1, table_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_corpus(path, puzzles):
+    with KakuroCorpusWriter(path) as writer:
+        for puzzle in puzzles:
+            writer.add(puzzle)
+
+
+class KakuroCorpusFile:
+    # memory-mapped reader, a puzzle is only decoded when it is asked for
+    def __init__(self, path):
+        with open(path, 'rb') as corpus_file:
+            self.map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.table_offset = FILE_HEADER.unpack_from(self.map)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError('not a kakuro corpus file: %s' % path)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start, end = FILE_OFFSETS.unpack_from(self.map, self.table_offset + index * FILE_OFFSET.size)
+        return self.map[start:end]
+
+    def __getitem__(self, index):
+        return unpack_puzzle(self.record(index))
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class KakuroCorpus:
+    # puzzle count, count + 1 offsets into the buffer and then the records, all in one flat buffer, the count and
+    # the offsets are 64-bit so a corpus is not held to 4 GiB
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        self.count = self.buffer[:8].cast('Q')[0]
+        self.offsets = self.buffer[8:16 + 8 * self.count].cast('Q')
+
+    @staticmethod
+    def pack(puzzles):
+        records = [encode_puzzle(puzzle) for puzzle in puzzles]
+        offsets = array('Q', [16 + 8 * len(records)])
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+        data = bytearray(array('Q', [len(records)]).tobytes() + offsets.tobytes())
+        for record in records:
+            data += record
+        return data
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        # a view into the buffer, nothing is copied until the puzzle is decoded
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    def dimensions(self, index):
+        start = self.offsets[index]
+        return self.buffer[start], self.buffer[start + 1]
+
+    def puzzle(self, index):
+        return decode_puzzle(self.record(index))
+
+    def release(self):
+        self.offsets.release()
+        self.buffer.release()
+
+
+class KakuroResults:
+    # one status byte per puzzle, then room for the solved grid of every puzzle
+    def __init__(self, buffer, corpus):
+        self.buffer = memoryview(buffer)
+        self.count = len(corpus)
+        self.offsets = [self.count]
+        for index in range(self.count):
+            height, width = corpus.dimensions(index)
+            self.offsets.append(self.offsets[-1] + height * width)
+
+    @staticmethod
+    def size(corpus):
+        total = len(corpus)
+        for index in range(len(corpus)):
+            height, width = corpus.dimensions(index)
+            total += height * width
+        return total
+
+    def status(self, index):
+        return self.buffer[index]
+
+    def values(self, index):
+        return bytes(self.buffer[self.offsets[index]:self.offsets[index + 1]])
+
+    def store(self, index, status, values=None):
+        if values is not None:
+            self.buffer[self.offsets[index]:self.offsets[index + 1]] = values
+        self.buffer[index] = status
+
+    def release(self):
+        self.buffer.release()
+
+
+class KakuroSharedCorpus:
+    def __init__(self, corpus_memory, results_memory, owner=False):
+        self.corpus_memory = corpus_memory
+        self.results_memory = results_memory
+        self.owner = owner
+        self.corpus = KakuroCorpus(corpus_memory.buf)
+        self.results = KakuroResults(results_memory.buf, self.corpus)
+
+    @classmethod
+    def create(cls, puzzles):
+        data = KakuroCorpus.pack(puzzles)
+        corpus_memory = shared_memory.SharedMemory(create=True, size=len(data))
+        corpus_memory.buf[:len(data)] = data
+        size = KakuroResults.size(KakuroCorpus(data))
+        results_memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        results_memory.buf[:size] = bytes(size)
+        return cls(corpus_memory, results_memory, owner=True)
+
+    @classmethod
+    def attach(cls, corpus_name, results_name):
+        return cls(shared_memory.SharedMemory(corpus_name), shared_memory.SharedMemory(results_name))
+
+    @property
+    def names(self):
+        return self.corpus_memory.name, self.results_memory.name
+
+    def close(self):
+        # the views have to go before the shared memory can be closed
+        self.corpus.release()
+        self.results.release()
+        self.corpus_memory.close()
+        self.results_memory.close()
+        if self.owner:
+            self.corpus_memory.unlink()
+            self.results_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+worker_corpus = None
+
+
+def init_worker(names):
+    global worker_corpus
+    worker_corpus = KakuroSharedCorpus.attach(*names)
+    # pool workers leave through os._exit, which skips atexit but still runs the multiprocessing finalizers
+    util.Finalize(worker_corpus, worker_corpus.close, exitpriority=0)
+
+
+def solve_index(index, agent_class):
+    try:
+        puzzle = worker_corpus.corpus.puzzle(index)
+        solution = agent_class(puzzle, verbose=False).backtracking_search(puzzle)
+    except Exception:
+        # raising would make executor.map give up on the whole batch, the status is all the caller needs
+        worker_corpus.results.store(index, FAILED)
+        return index
+    if solution is None:
+        worker_corpus.results.store(index, UNSOLVABLE)
+    else:
+        worker_corpus.results.store(index, SOLVED, solution.value_buffer())
+    return index
+
+
+def solve_corpus(puzzles, workers=None, agent_class=IntelligentKakuroAgent, chunksize=1):
+    # returns (status, row-major values) per puzzle, the values are all zero unless the status is SOLVED
+    with KakuroSharedCorpus.create(puzzles) as shared:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(shared.names,)) as executor:
+            for _ in executor.map(solve_index, range(len(shared.corpus)), repeat(agent_class), chunksize=chunksize):
+                pass
+        return [(shared.results.status(index), shared.results.values(index)) for index in range(len(shared.corpus))]
@@ -0,0 +1,173 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+from Propagation import POPCOUNT, KakuroConstraints, KakuroPropagator, digits_of
+
+worker_constraints = None
+worker_domains = None
+worker_rules = None
+
+
+def init_worker(constraints, domains, rules):
+    global worker_constraints, worker_domains, worker_rules
+    worker_constraints = constraints
+    worker_domains = domains
+    worker_rules = rules
+
+
+def find_components(propagator, cells):
+    # clues are the nodes of the crossing graph, every undecided cell joins the clues that share it
+    cell_clues = propagator.constraints.cell_clues
+    parent = {}
+
+    def find(clue_index):
+        while parent[clue_index] != clue_index:
+            parent[clue_index] = parent[parent[clue_index]]
+            clue_index = parent[clue_index]
+        return clue_index
+
+    open_cells = [cell_index for cell_index in cells if POPCOUNT[propagator.domains[cell_index]] > 1]
+    for cell_index in open_cells:
+        roots = []
+        for clue_index in cell_clues[cell_index]:
+            parent.setdefault(clue_index, clue_index)
+            roots.append(find(clue_index))
+        for root in roots[1:]:
+            parent[root] = roots[0]
+
+    components = {}
+    for cell_index in open_cells:
+        components.setdefault(find(cell_clues[cell_index][0]), []).append(cell_index)
+    return list(components.values())
+
+
+def find_articulation_cells(propagator, cells):
+    # a cell is an articulation cell when it is a bridge of the crossing graph
+    cell_clues = propagator.constraints.cell_clues
+    adjacency = {}
+    for cell_index in cells:
+        clue_indices = cell_clues[cell_index]
+        if len(clue_indices) == 2 and POPCOUNT[propagator.domains[cell_index]] > 1:
+            first, second = clue_indices
+            adjacency.setdefault(first, []).append((second, cell_index))
+            adjacency.setdefault(second, []).append((first, cell_index))
+
+    order = {}
+    low = {}
+    bridges = []
+    for start in adjacency:
+        if start in order:
+            continue
+        order[start] = low[start] = len(order)
+        stack = [(start, None, iter(adjacency[start]))]
+        while stack:
+            node, via, edges = stack[-1]
+            for neighbour, cell_index in edges:
+                if cell_index == via:
+                    continue
+                if neighbour in order:
+                    low[node] = min(low[node], order[neighbour])
+                else:
+                    order[neighbour] = low[neighbour] = len(order)
+                    stack.append((neighbour, cell_index, iter(adjacency[neighbour])))
+                    break
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                    if low[node] > order[parent]:
+                        bridges.append(via)
+    return bridges
+
+
+def solve_cells(propagator, cells):
+    values = {}
+    for component in find_components(propagator, cells):
+        bridges = find_articulation_cells(propagator, component)
+        if not bridges:
+            solution = propagator.solve(component)
+            if solution is None:
+                return None
+            for cell_index in component:
+                values[cell_index] = solution[cell_index]
+            continue
+
+        # fixing a bridge splits its component in two independent halves
+        bridge = min(bridges, key=lambda cell_index: POPCOUNT[propagator.domains[cell_index]])
+        rest = [cell_index for cell_index in component if cell_index != bridge]
+        for digit in digits_of(propagator.domains[bridge]):
+            mark = propagator.mark()
+            propagator.nodes += 1
+            if propagator.assign(bridge, digit):
+                part = solve_cells(propagator, rest)
+                if part is not None:
+                    fixed = propagator.values()
+                    for cell_index in rest:
+                        part.setdefault(cell_index, fixed[cell_index])
+                    values.update(part)
+                    values[bridge] = digit
+                    propagator.undo(mark)
+                    break
+            propagator.undo(mark)
+        else:
+            return None
+    return values
+
+
+def solve_component(constraints, domains, cells, rules=None):
+    return solve_cells(KakuroPropagator(constraints, domains, rules), cells)
+
+
+def solve_batch(components):
+    # the constraints and domains came once with the worker, a batch only carries cell indices
+    return [solve_component(worker_constraints, worker_domains, component, worker_rules) for component in components]
+
+
+def batch_components(components, count):
+    # largest first and dealt round robin, so every batch gets a similar share of the cells
+    ordered = sorted(components, key=len, reverse=True)
+    return [ordered[start::count] for start in range(min(count, len(ordered)))]
+
+
+class KakuroDecomposition:
+    def __init__(self, puzzle, rules=None):
+        self.puzzle = puzzle
+        self.constraints = KakuroConstraints(puzzle)
+        self.propagator = KakuroPropagator(self.constraints, rules=rules)
+        self.consistent = self.propagator.propagate()
+        cells = range(len(self.constraints.cells))
+        if self.consistent:
+            self.components = find_components(self.propagator, cells)
+            self.articulation_cells = [self.constraints.cells[i] for i in find_articulation_cells(self.propagator, cells)]
+        else:
+            self.components = []
+            self.articulation_cells = []
+
+    def component_locations(self):
+        return [[self.constraints.cells[i] for i in component] for component in self.components]
+
+    def solve(self, workers=None):
+        if not self.consistent:
+            return None
+
+        values = self.propagator.values()
+        if workers and len(self.components) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(self.constraints, self.propagator.domains,
+                                               self.propagator.rules)) as executor:
+                batches = batch_components(self.components, workers)
+                parts = [part for batch in executor.map(solve_batch, batches) for part in batch]
+        else:
+            parts = [solve_cells(self.propagator, component) for component in self.components]
+
+        for part in parts:
+            if part is None:
+                return None
+            for cell_index, digit in part.items():
+                values[cell_index] = digit
+
+        solution = copy.deepcopy(self.puzzle)
+        for (row, col), digit in zip(self.constraints.cells, values):
+            solution.puzzle[row][col].value = digit
+        return solution
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import struct
+import tempfile
+
+from Corpus import CLUE_KIND, WHITE_KIND, KakuroCorpusFile, KakuroCorpusWriter, build_record, pack_puzzle, parse_record
+
+DIGEST_SIZE = 16
+# digest and record length in front of every record in a bucket file
+BUCKET_ENTRY = struct.Struct('<%dsI' % DIGEST_SIZE)
+
+
+def transpose_record(record):
+    # rows become columns and every down clue becomes a right clue and the other way round
+    height, width, kinds, clues, values = parse_record(record)
+    clue_iter = iter(clues)
+    value_iter = iter(values)
+    contents = []
+    for kind in kinds:
+        if kind == CLUE_KIND:
+            contents.append(next(clue_iter))
+        elif kind == WHITE_KIND:
+            contents.append(next(value_iter))
+        else:
+            contents.append(None)
+
+    new_kinds = []
+    new_clues = []
+    new_values = []
+    for col in range(width):
+        for row in range(height):
+            index = row * width + col
+            new_kinds.append(kinds[index])
+            if kinds[index] == CLUE_KIND:
+                down, right = contents[index]
+                new_clues.append((right, down))
+            elif kinds[index] == WHITE_KIND:
+                new_values.append(contents[index])
+    return build_record(width, height, new_kinds, new_clues, new_values)
+
+
+def canonical_record(record):
+    # the smaller of a record and its transpose, equal for a board and its transpose
+    return min(record, transpose_record(record))
+
+
+def record_hash(record):
+    return hashlib.blake2b(canonical_record(record), digest_size=DIGEST_SIZE).digest()
+
+
+def canonical_form(puzzle):
+    return canonical_record(pack_puzzle(puzzle))
+
+
+def canonical_hash(puzzle):
+    return record_hash(pack_puzzle(puzzle))
+
+
+def dedupe_records(records, output_path, bucket_count=64, work_dir=None):
+    # bounded memory in two passes: records are spread over bucket files by hash, then each bucket is read
+    # back on its own and only its first record per hash is kept, output is grouped by bucket
+    stats = {"read": 0, "unique": 0}
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        paths = [os.path.join(directory, '%d.bucket' % bucket) for bucket in range(bucket_count)]
+        buckets = [open(path, 'wb') for path in paths]
+        try:
+            for record in records:
+                record = bytes(record)
+                digest = record_hash(record)
+                bucket = buckets[int.from_bytes(digest[:4], 'little') % bucket_count]
+                bucket.write(BUCKET_ENTRY.pack(digest, len(record)))
+                bucket.write(record)
+                stats["read"] += 1
+        finally:
+            for bucket in buckets:
+                bucket.close()
+
+        with KakuroCorpusWriter(output_path) as writer:
+            for path in paths:
+                seen = set()
+                with open(path, 'rb') as bucket:
+                    while True:
+                        entry = bucket.read(BUCKET_ENTRY.size)
+                        if not entry:
+                            break
+                        digest, length = BUCKET_ENTRY.unpack(entry)
+                        record = bucket.read(length)
+                        if digest not in seen:
+                            seen.add(digest)
+                            writer.add_record(record)
+                os.remove(path)
+                stats["unique"] += len(seen)
+    return stats
+
+
+def dedupe_puzzles(puzzles, output_path, bucket_count=64, work_dir=None):
+    return dedupe_records((pack_puzzle(puzzle) for puzzle in puzzles), output_path, bucket_count, work_dir)
+
+
+def dedupe_corpus_file(input_path, output_path, bucket_count=64, work_dir=None):
+    # works on the packed records directly, no puzzle is decoded
+    with KakuroCorpusFile(input_path) as corpus:
+        return dedupe_records((corpus.record(index) for index in range(len(corpus))), output_path,
+                              bucket_count, work_dir)
@@ -0,0 +1,63 @@
+import copy
+import heapq
+import timeit
+from itertools import count, islice
+
+from BackTracking import PAUSED, SOLVED, IntelligentKakuroAgent, KakuroSearch
+from Propagation import POPCOUNT
+
+
+class LeastConstrainingKakuroAgent(IntelligentKakuroAgent):
+    # how many value sets of a clue are scored, a long empty clue can have thousands
+    scored_value_sets = 64
+
+    def order_domain_values(self, clue, cell_set, assignment, rng=None):
+        # value sets that leave the crossing clues the most digits come first, scoring has to see them all before
+        # the first one is tried so this part of the ordering is eager, it is bounded to the first scored_value_sets
+        # value sets and the rest follow lazily in the order of IntelligentKakuroAgent
+        new_cells = [cell for cell in cell_set if cell.value == 0]
+        crossings = [other for cell in new_cells for other in assignment.cell_clues.get(cell.location, ())
+                     if other is not clue]
+        value_sets = super().order_domain_values(clue, cell_set, assignment, rng)
+        scored = []
+        for position, value_set in enumerate(islice(value_sets, self.scored_value_sets)):
+            assignment.assign_clue(clue, value_set)
+            freedom = sum(POPCOUNT[assignment.clue_domain(other)] for other in crossings)
+            for cell in new_cells:
+                cell.value = 0
+            scored.append((-freedom, position, value_set))
+        # a heap pays for the value sets that are tried, a search that succeeds early never sorts the rest
+        heapq.heapify(scored)
+        while scored:
+            yield heapq.heappop(scored)[2]
+        yield from value_sets
+
+
+def limited_discrepancy_search(puzzle, agent_class=IntelligentKakuroAgent, max_discrepancies=None, time_budget=None):
+    # runs the search with at most k discrepancies from the agent's ordering for k = 0, 1, 2, ...
+    # every iteration starts again from the root, so nodes counts the nodes of the earlier iterations it
+    # visits again and can exceed a plain depth-first search, iteration_nodes has what each iteration took
+    agent = agent_class(puzzle, verbose=False)
+    deadline = None if time_budget is None else timeit.default_timer() + time_budget
+    stats = {"discrepancies": None, "iterations": 0, "nodes": 0, "iteration_nodes": [], "timed_out": False}
+    for k in count():
+        if max_discrepancies is not None and k > max_discrepancies:
+            break
+        assignment = copy.deepcopy(puzzle)
+        search = KakuroSearch(agent, assignment)
+        search.max_discrepancies = k
+        search.deadline = deadline
+        status = search.run()
+        stats["discrepancies"] = k
+        stats["iterations"] += 1
+        stats["iteration_nodes"].append(agent.nodes - stats["nodes"])
+        stats["nodes"] = agent.nodes
+        if status == SOLVED:
+            return assignment, stats
+        if status == PAUSED:
+            stats["timed_out"] = True
+            break
+        if not search.cut:
+            # nothing was cut, so the last iteration was a complete search
+            break
+    return None, stats
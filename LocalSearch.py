@@ -0,0 +1,171 @@
+import copy
+import random
+
+from BackTracking import DIGITS, digits_of
+
+
+class KakuroLocalSearch:
+    def __init__(self, puzzle, rng=None, tabu_tenure=8, walk_probability=0.1, use_sums=True, fixed=()):
+        self.puzzle = puzzle
+        self.rng = rng if rng is not None else random.Random()
+        self.tabu_tenure = tabu_tenure
+        self.walk_probability = walk_probability
+        # without sums only the all-different rule counts, which is what a generator template needs
+        self.use_sums = use_sums
+
+        self.locations = list(puzzle.cell_clues)
+        self.index = {location: i for i, location in enumerate(self.locations)}
+        self.clue_cells = [[self.index[cell.location] for cell in puzzle.get_cell_set(clue)] for clue in puzzle.clues]
+        self.cell_clues = [[] for _ in self.locations]
+        for clue_index, members in enumerate(self.clue_cells):
+            for cell_index in members:
+                self.cell_clues[cell_index].append(clue_index)
+        self.goals = [clue.goal_sum for clue in puzzle.clues]
+        self.fixed = {self.index[location] for location in fixed}
+
+        self.choices = []
+        for row, col in self.locations:
+            domain = puzzle.puzzle[row][col].domain if use_sums else 0
+            self.choices.append(digits_of(domain) or list(DIGITS))
+
+        self.values = [0] * len(self.locations)
+        self.steps = 0
+        self.history = []
+        self.tabu = {}
+        self.best_conflicts = None
+        self.best_values = None
+        # a grid that is almost right is repaired from its own values, empty cells start at random
+        self.reset(keep_values=True)
+
+    def reset(self, keep_values=False):
+        for cell_index, (row, col) in enumerate(self.locations):
+            value = self.puzzle.puzzle[row][col].value
+            if cell_index in self.fixed or (keep_values and value != 0):
+                self.values[cell_index] = value
+            else:
+                self.values[cell_index] = self.rng.choice(self.choices[cell_index])
+        self.sums = [0] * len(self.clue_cells)
+        self.counts = [[0] * 10 for _ in self.clue_cells]
+        for clue_index, members in enumerate(self.clue_cells):
+            for cell_index in members:
+                self.sums[clue_index] += self.values[cell_index]
+                self.counts[clue_index][self.values[cell_index]] += 1
+        self.clue_costs = [self.clue_cost(clue_index) for clue_index in range(len(self.clue_cells))]
+        self.conflicts = sum(self.clue_costs)
+        self.tabu = {}
+        if self.best_conflicts is None or self.conflicts < self.best_conflicts:
+            self.best_conflicts = self.conflicts
+            self.best_values = list(self.values)
+
+    def clue_cost(self, clue_index):
+        # distance from the goal sum plus one per repeated digit
+        cost = sum(count - 1 for count in self.counts[clue_index] if count > 1)
+        if self.use_sums:
+            cost += abs(self.sums[clue_index] - self.goals[clue_index])
+        return cost
+
+    def delta(self, cell_index, digit):
+        old = self.values[cell_index]
+        change = 0
+        for clue_index in self.cell_clues[cell_index]:
+            counts = self.counts[clue_index]
+            change += (counts[digit] > 0) - (counts[old] > 1)
+            if self.use_sums:
+                total = self.sums[clue_index]
+                goal = self.goals[clue_index]
+                change += abs(total - old + digit - goal) - abs(total - goal)
+        return change
+
+    def set_value(self, cell_index, digit):
+        old = self.values[cell_index]
+        self.values[cell_index] = digit
+        for clue_index in self.cell_clues[cell_index]:
+            self.sums[clue_index] += digit - old
+            self.counts[clue_index][old] -= 1
+            self.counts[clue_index][digit] += 1
+            cost = self.clue_cost(clue_index)
+            self.conflicts += cost - self.clue_costs[clue_index]
+            self.clue_costs[clue_index] = cost
+
+    def conflicting_cells(self):
+        return [cell_index for clue_index, cost in enumerate(self.clue_costs) if cost
+                for cell_index in self.clue_cells[clue_index] if cell_index not in self.fixed]
+
+    def step(self):
+        cells = self.conflicting_cells()
+        if not cells:
+            return False
+        self.steps += 1
+        cell_index = self.rng.choice(cells)
+        old = self.values[cell_index]
+        candidates = [digit for digit in self.choices[cell_index] if digit != old]
+
+        if self.rng.random() < self.walk_probability:
+            if not candidates:
+                return True
+            digit = self.rng.choice(candidates)
+        else:
+            # the current digit competes at no cost, a cell that is already right in a bad clue can stay
+            best = 0
+            best_digits = [old]
+            for digit in candidates:
+                change = self.delta(cell_index, digit)
+                # a tabu move is still allowed when it beats the best grid seen so far
+                if self.tabu.get((cell_index, digit), 0) > self.steps and \
+                        self.conflicts + change >= self.best_conflicts:
+                    continue
+                if change < best:
+                    best = change
+                    best_digits = [digit]
+                elif change == best:
+                    best_digits.append(digit)
+            digit = self.rng.choice(best_digits)
+            if digit == old:
+                return True
+
+        self.tabu[(cell_index, old)] = self.steps + self.tabu_tenure
+        self.set_value(cell_index, digit)
+        if self.conflicts < self.best_conflicts:
+            self.best_conflicts = self.conflicts
+            self.best_values = list(self.values)
+        return True
+
+    def run(self, max_steps, history_interval=100):
+        # returns True once a grid without conflicts is found, history holds (step, conflicts) samples
+        for _ in range(max_steps):
+            if self.steps % history_interval == 0:
+                self.history.append((self.steps, self.conflicts))
+            if not self.step():
+                break
+        self.history.append((self.steps, self.conflicts))
+        return self.conflicts == 0
+
+    def solution(self):
+        if self.best_conflicts != 0:
+            return None
+        solution = copy.deepcopy(self.puzzle)
+        for (row, col), value in zip(self.locations, self.best_values):
+            solution.puzzle[row][col].value = value
+        return solution
+
+
+def solve_local(puzzle, max_steps=10000, max_restarts=0, seed=None, use_sums=True, **options):
+    search = KakuroLocalSearch(puzzle, rng=random.Random(seed), use_sums=use_sums, **options)
+    for restart in range(max_restarts + 1):
+        if restart:
+            search.reset()
+        if search.run(max_steps):
+            break
+    return search.solution(), search
+
+
+def fill_template(puzzle, max_steps=10000, max_restarts=10, seed=None):
+    # fills a generator template, whose sums may be None, with distinct digits per run and sets every clue sum
+    # from the fill
+    solution, search = solve_local(puzzle, max_steps, max_restarts, seed, use_sums=False)
+    if solution is None:
+        return None
+    for clue in solution.clues:
+        clue.goal_sum = sum(cell.value for cell in solution.get_cell_set(clue))
+    solution.seed_domains()
+    return solution
@@ -0,0 +1,278 @@
+import copy
+import os
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from BackTracking import PAUSED, SOLVED, IntelligentKakuroAgent, KakuroSearch
+
+# seconds, from a quick easy board up to a search that ran into a generous time budget
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, escape_label(value)) for name, value in pairs)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class KakuroMetric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, *values, **named):
+        if named:
+            values = tuple(named[name] for name in self.label_names)
+        if len(values) != len(self.label_names):
+            raise ValueError("%s takes the labels %s" % (self.name, ", ".join(self.label_names)))
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.new_child())
+        return child
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        # (suffix, label values, extra label pairs, value) for every sample of the metric
+        raise NotImplementedError
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help_text), "# TYPE %s %s" % (self.name, self.kind)]
+        with self.lock:
+            for suffix, values, extra, value in self.samples():
+                lines.append("%s%s%s %s" % (self.name, suffix, format_labels(self.label_names, values, extra),
+                                            format_value(value)))
+        return "\n".join(lines)
+
+
+class KakuroCounterChild:
+    def __init__(self, lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        with self.lock:
+            self.value += amount
+
+
+class KakuroCounter(KakuroMetric):
+    # prometheus expects counter names to end in _total
+    kind = "counter"
+
+    def new_child(self):
+        return KakuroCounterChild(self.lock)
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield "", values, (), child.value
+
+
+class KakuroGaugeChild:
+    def __init__(self, lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+
+class KakuroGauge(KakuroMetric):
+    kind = "gauge"
+
+    def new_child(self):
+        return KakuroGaugeChild(self.lock)
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield "", values, (), child.value
+
+
+class KakuroHistogramChild:
+    def __init__(self, lock, buckets):
+        self.lock = lock
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        with self.lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            self.count += 1
+            self.sum += value
+
+
+class KakuroHistogram(KakuroMetric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def new_child(self):
+        return KakuroHistogramChild(self.lock, self.buckets)
+
+    def samples(self):
+        for values, child in self.children.items():
+            # the counts are kept per bucket and only made cumulative here
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield "_bucket", values, (("le", format_value(float(bound))),), cumulative
+            yield "_bucket", values, (("le", "+Inf"),), child.count
+            yield "_sum", values, (), child.sum
+            yield "_count", values, (), child.count
+
+
+class KakuroMetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError("metric %s is already registered differently" % metric.name)
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(KakuroCounter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(KakuroGauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register(KakuroHistogram(name, help_text, label_names, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write(self, path):
+        # written next to the target and renamed, a scraper reading the file never sees half of it
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        # answers every GET with the current metrics from a daemon thread, call shutdown() on the result to stop
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+class KakuroSolverMetrics:
+    # the solve metrics of the service, broken down by agent class and board size
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else KakuroMetricsRegistry()
+        labels = ("agent", "board")
+        registry = self.registry
+        self.latency = registry.histogram("kakuro_solve_duration_seconds", "Time spent per solve.", labels)
+        self.solves = registry.counter("kakuro_solves_total", "Finished solves by outcome.", labels + ("outcome",))
+        self.timeouts = registry.counter("kakuro_solve_timeouts_total", "Solves stopped by their time budget.", labels)
+        self.active = registry.gauge("kakuro_active_solves", "Solves currently running.", labels)
+        self.nodes = registry.counter("kakuro_search_nodes_total", "Search nodes entered.", labels)
+        self.nodes_per_second = registry.gauge("kakuro_search_nodes_per_second",
+                                               "Search nodes per second of the last solve.", labels)
+        self.nogood_lookups = registry.counter("kakuro_nogood_lookups_total", "Nogood cache lookups.", labels)
+        self.nogood_hits = registry.counter("kakuro_nogood_hits_total", "Nogood cache lookups that pruned a value set.",
+                                            labels)
+        self.nogood_hit_ratio = registry.gauge("kakuro_nogood_hit_ratio",
+                                               "Nogood cache hit ratio of the last solve.", labels)
+
+    def solve(self, puzzle, agent_class=IntelligentKakuroAgent, time_budget=None):
+        # solves a copy of the puzzle and returns the solution, None when it has none or the budget ran out
+        labels = (agent_class.__name__, "%dx%d" % (puzzle.height, puzzle.width))
+        agent = agent_class(puzzle, verbose=False)
+        search = KakuroSearch(agent, copy.deepcopy(puzzle))
+        if time_budget is not None:
+            search.deadline = timeit.default_timer() + time_budget
+        active = self.active.labels(*labels)
+        active.inc()
+        start = timeit.default_timer()
+        # stays None when the search raises, the solve is still recorded before the error goes on
+        status = None
+        try:
+            status = search.run()
+        finally:
+            elapsed = timeit.default_timer() - start
+            active.dec()
+            self.record(labels, agent, status, elapsed)
+        return search.assignment if status == SOLVED else None
+
+    def record(self, labels, agent, status, elapsed):
+        self.latency.labels(*labels).observe(elapsed)
+        if status is None:
+            outcome = "failed"
+        elif status == PAUSED:
+            self.timeouts.labels(*labels).inc()
+            outcome = "timeout"
+        else:
+            outcome = "solved" if status == SOLVED else "unsolvable"
+        self.solves.labels(*(labels + (outcome,))).inc()
+        self.nodes.labels(*labels).inc(agent.nodes)
+        if elapsed > 0:
+            self.nodes_per_second.labels(*labels).set(agent.nodes / elapsed)
+        nogoods = agent.nogoods
+        self.nogood_lookups.labels(*labels).inc(nogoods.lookups)
+        self.nogood_hits.labels(*labels).inc(nogoods.hits)
+        if nogoods.lookups:
+            self.nogood_hit_ratio.labels(*labels).set(nogoods.hits / nogoods.lookups)
@@ -0,0 +1,119 @@
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import timeit
+from collections import Counter
+
+import BackTracking
+import LCV
+import MRV
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = {
+    "backtracking": BackTracking.KakuroAgent,
+    "intelligent": BackTracking.IntelligentKakuroAgent,
+    "mrv": MRV.KakuroAgent,
+    "lcv": LCV.KakuroAgent,
+}
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+FAILED = "failed"
+
+
+def run_strategy(name, agent_class, puzzle, results):
+    # the MRV and LCV agents always print, keep the parent's terminal clean
+    sys.stdout = open(os.devnull, "w")
+    start = timeit.default_timer()
+    try:
+        agent = agent_class(puzzle)
+        agent.verbose = False
+        solution = agent.backtracking_search(puzzle)
+    except Exception as error:
+        results.put((name, FAILED, repr(error), timeit.default_timer() - start))
+        return
+    if solution is None:
+        results.put((name, UNSOLVABLE, None, timeit.default_timer() - start))
+    else:
+        results.put((name, SOLVED, solution.value_buffer(), timeit.default_timer() - start))
+
+
+class PortfolioResult:
+    def __init__(self, winner, status, solution, elapsed):
+        self.winner = winner
+        self.status = status
+        self.solution = solution
+        self.elapsed = elapsed
+
+
+def solve_portfolio(puzzle, strategies=None, timeout=None, board_class=None, log_path=None):
+    names = list(strategies or STRATEGIES)
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    processes = [context.Process(target=run_strategy, args=(name, STRATEGIES[name], puzzle, results), daemon=True)
+                 for name in names]
+
+    start = timeit.default_timer()
+    for process in processes:
+        process.start()
+
+    result = PortfolioResult(None, None, None, None)
+    statuses = {}
+    timed_out = False
+    pending = len(processes)
+    try:
+        while pending:
+            remaining = None if timeout is None else max(0.0, timeout - (timeit.default_timer() - start))
+            try:
+                name, status, payload, elapsed = results.get(timeout=remaining)
+            except queue.Empty:
+                timed_out = True
+                break
+            pending -= 1
+            statuses[name] = status
+            if status == FAILED:
+                logger.warning("strategy %s failed: %s", name, payload)
+                continue
+            # a complete search that finds nothing is as conclusive as a solution
+            result = PortfolioResult(name, status, None, timeit.default_timer() - start)
+            if status == SOLVED:
+                result.solution = copy.deepcopy(puzzle)
+                result.solution.load_value_buffer(payload)
+            break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+    board_class = board_class or "%dx%d" % (puzzle.height, puzzle.width)
+    if timed_out:
+        logger.info("portfolio timed out on %s after %.3fs", board_class, timeit.default_timer() - start)
+    elif result.winner is None:
+        # every strategy reported back and none of them had an answer
+        logger.info("no strategy solved %s (%s) after %.3fs", board_class,
+                    ", ".join("%s %s" % (name, statuses[name]) for name in names), timeit.default_timer() - start)
+    else:
+        logger.info("portfolio winner on %s: %s (%s) in %.3fs", board_class, result.winner, result.status,
+                    result.elapsed)
+    if log_path is not None:
+        with open(log_path, "a") as log_file:
+            log_file.write(json.dumps({"board_class": board_class, "winner": result.winner, "status": result.status,
+                                       "elapsed": result.elapsed, "strategies": names}) + "\n")
+    return result
+
+
+def best_strategies(log_path):
+    wins = {}
+    with open(log_path) as log_file:
+        for line in log_file:
+            entry = json.loads(line)
+            if entry["winner"] is not None:
+                wins.setdefault(entry["board_class"], Counter())[entry["winner"]] += 1
+    return {board_class: counter.most_common(1)[0][0] for board_class, counter in wins.items()}
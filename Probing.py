@@ -0,0 +1,147 @@
+import copy
+import timeit
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from BackTracking import IntelligentKakuroAgent
+from Propagation import DIGIT_OF, POPCOUNT, KakuroConstraints, KakuroPropagator, digits_of
+
+worker_constraints = None
+worker_rules = None
+
+
+def init_worker(constraints, rules):
+    global worker_constraints, worker_rules
+    worker_constraints = constraints
+    worker_rules = rules
+
+
+def probe_cells(propagator, cells, deadline=None):
+    # tries every digit of every cell and returns {cell: digits that wipe out}, the propagator is left unchanged
+    failed = {}
+    for cell_index in cells:
+        if deadline is not None and timeit.default_timer() >= deadline:
+            break
+        for digit in digits_of(propagator.domains[cell_index]):
+            mark = propagator.mark()
+            if not propagator.assign(cell_index, digit):
+                failed[cell_index] = failed.get(cell_index, 0) | (1 << digit)
+            propagator.undo(mark)
+    return failed
+
+
+def probe_chunk(domains, cells, deadline):
+    # the worker's rules are copies, what they did for this chunk goes back with the result
+    before = [rule.stats() for rule in worker_rules]
+    failed = probe_cells(KakuroPropagator(worker_constraints, domains, worker_rules), cells, deadline)
+    return failed, [{key: value - start[key] for key, value in rule.stats().items()}
+                    for rule, start in zip(worker_rules, before)]
+
+
+class KakuroProber:
+    def __init__(self, puzzle, rules=None):
+        self.puzzle = puzzle
+        self.constraints = KakuroConstraints(puzzle)
+        self.propagator = KakuroPropagator(self.constraints, rules=rules)
+        self.consistent = self.propagator.propagate()
+        self.rounds = 0
+        self.removed = 0
+        self.timed_out = False
+
+    def add_rule_stats(self, rule_stats):
+        for rule, stats in zip(self.propagator.rules, rule_stats):
+            rule.calls += stats["calls"]
+            rule.removals += stats["removals"]
+            rule.wipeouts += stats["wipeouts"]
+            rule.seconds += stats["seconds"]
+
+    def open_cells(self):
+        return [i for i, mask in enumerate(self.propagator.domains) if POPCOUNT[mask] > 1]
+
+    def remove(self, failed):
+        # counts every digit the removal takes out, propagation included, through the propagator's own counter;
+        # chunks probed in parallel report digits an earlier chunk already removed, those are not counted again
+        propagator = self.propagator
+        removed = propagator.removed
+        changed = []
+        consistent = True
+        for cell_index, mask in failed.items():
+            if propagator.restrict(cell_index, ~mask):
+                if not propagator.domains[cell_index]:
+                    consistent = False
+                    break
+                changed.append(cell_index)
+        if consistent:
+            clues = {clue_index for cell_index in changed for clue_index in self.constraints.cell_clues[cell_index]}
+            consistent = propagator.propagate(clues)
+        self.removed += propagator.removed - removed
+        return consistent
+
+    def probe(self, time_budget=None, workers=None, chunk_size=8):
+        # repeats failed-literal probing until nothing more is removed or the budget runs out
+        deadline = None if time_budget is None else timeit.default_timer() + time_budget
+        executor = None
+        if workers:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                           initargs=(self.constraints, self.propagator.rules))
+        try:
+            while self.consistent:
+                cells = self.open_cells()
+                if not cells:
+                    break
+                self.rounds += 1
+                removed = self.removed
+                if executor is None:
+                    # sequential probing removes a digit as soon as it fails, later probes see the smaller domains
+                    for cell_index in cells:
+                        if deadline is not None and timeit.default_timer() >= deadline:
+                            self.timed_out = True
+                            break
+                        failed = probe_cells(self.propagator, [cell_index])
+                        if failed and not self.remove(failed):
+                            self.consistent = False
+                            break
+                else:
+                    domains = list(self.propagator.domains)
+                    futures = [executor.submit(probe_chunk, domains, cells[start:start + chunk_size], deadline)
+                               for start in range(0, len(cells), chunk_size)]
+                    pending = set(futures)
+                    while pending and self.consistent:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            failed, rule_stats = future.result()
+                            self.add_rule_stats(rule_stats)
+                            if not self.remove(failed):
+                                self.consistent = False
+                                break
+                    for future in pending:
+                        future.cancel()
+                    if deadline is not None and timeit.default_timer() >= deadline:
+                        self.timed_out = True
+                if self.timed_out or self.removed == removed:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return self.consistent
+
+    def probed_puzzle(self):
+        # a copy whose cell domains are the probed ones and whose decided cells are filled in
+        if not self.consistent:
+            return None
+        puzzle = copy.deepcopy(self.puzzle)
+        for (row, col), mask in zip(self.constraints.cells, self.propagator.domains):
+            cell = puzzle.puzzle[row][col]
+            cell.domain = mask
+            if mask in DIGIT_OF:
+                cell.value = DIGIT_OF[mask]
+                puzzle.givens.add((row, col))
+        return puzzle
+
+
+def solve_with_probing(puzzle, agent_class=IntelligentKakuroAgent, time_budget=None, workers=None, rules=None):
+    prober = KakuroProber(puzzle, rules)
+    if not prober.probe(time_budget, workers):
+        return None, prober, None
+    probed = prober.probed_puzzle()
+    agent = agent_class(probed, verbose=False, rules=rules)
+    return agent.backtracking_search(probed), prober, agent
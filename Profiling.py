@@ -0,0 +1,133 @@
+import ast
+import cProfile
+import os
+import pstats
+import tracemalloc
+
+from BackTracking import IntelligentKakuroAgent, KakuroAgent
+from Discrepancy import LeastConstrainingKakuroAgent
+from Restarts import RandomizedKakuroAgent
+
+AGENTS = {
+    "backtracking": KakuroAgent,
+    "intelligent": IntelligentKakuroAgent,
+    "least-constraining": LeastConstrainingKakuroAgent,
+    "randomized": RandomizedKakuroAgent,
+}
+
+# listed first in the summary, whatever their cost
+KEY_FUNCTIONS = ("order_domain_values", "sum_to_n", "is_consistent", "get_cell_set")
+
+SOLVER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_solver_file(filename):
+    # built-in functions are listed under "~", which would resolve to the working directory
+    return filename.endswith(".py") and os.path.dirname(os.path.abspath(filename)) == SOLVER_DIRECTORY
+
+
+def function_ranges(filename):
+    # (first line, last line, qualified name) of every function in a solver module
+    with open(filename) as source_file:
+        tree = ast.parse(source_file.read())
+    ranges = []
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                name = prefix + child.name
+                if isinstance(child, ast.FunctionDef):
+                    ranges.append((child.lineno, child.end_lineno, name))
+                visit(child, name + ".")
+
+    visit(tree, "")
+    return ranges
+
+
+def enclosing_function(ranges, lineno):
+    # the innermost function wins, it is the one with the latest first line
+    best = None
+    for first, last, name in ranges:
+        if first <= lineno <= last and (best is None or first > best[0]):
+            best = (first, name)
+    return best[1] if best is not None else "<module>"
+
+
+def solver_function_stats(stats):
+    # calls, own time and cumulative time per solver function, keyed by module and qualified name
+    ranges = {}
+    grouped = {}
+    for (filename, lineno, function), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+        if not is_solver_file(filename):
+            continue
+        if filename not in ranges:
+            ranges[filename] = function_ranges(filename)
+        name = "%s:%s" % (os.path.basename(filename), enclosing_function(ranges[filename], lineno))
+        entry = grouped.setdefault(name, [function, 0, 0.0, 0.0])
+        entry[1] += calls
+        entry[2] += own_time
+        entry[3] += cumulative_time
+    return grouped
+
+
+def solver_allocations(snapshot):
+    # bytes and blocks still allocated at the end of the solve, by the solver function that allocated them
+    ranges = {}
+    grouped = {}
+    for statistic in snapshot.statistics("traceback"):
+        # frames run from the oldest call to the allocation, the last solver frame did the allocating
+        for frame in reversed(statistic.traceback):
+            if is_solver_file(frame.filename):
+                if frame.filename not in ranges:
+                    ranges[frame.filename] = function_ranges(frame.filename)
+                name = "%s:%s" % (os.path.basename(frame.filename), enclosing_function(ranges[frame.filename],
+                                                                                       frame.lineno))
+                entry = grouped.setdefault(name, [0, 0])
+                entry[0] += statistic.size
+                entry[1] += statistic.count
+                break
+    return grouped
+
+
+def profile_solve(puzzle, agent_class=IntelligentKakuroAgent, output_prefix="kakuro-profile", top=20):
+    # writes <prefix>.pstats for pstats or snakeviz and <prefix>.txt with the summary, returns the solution
+    agent = agent_class(puzzle, verbose=False)
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    try:
+        profiler.enable()
+        try:
+            solution = agent.backtracking_search(puzzle)
+        finally:
+            profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    profiler.dump_stats(output_prefix + ".pstats")
+
+    stats = pstats.Stats(profiler)
+    functions = solver_function_stats(stats)
+    ordered = sorted(functions.items(), key=lambda item: (item[1][0] not in KEY_FUNCTIONS, -item[1][3]))
+    lines = ["%s on a %dx%d board: %s, %d nodes, %.3fs, peak traced memory %.1f KiB"
+             % (agent_class.__name__, puzzle.height, puzzle.width, "solved" if solution else "no solution",
+                agent.nodes, stats.total_tt, peak / 1024.0),
+             "", "solver functions", "%10s  %10s  %12s  %s" % ("calls", "own s", "cumulative s", "function")]
+    for name, (_, calls, own_time, cumulative_time) in ordered[:top]:
+        lines.append("%10d  %10.4f  %12.4f  %s" % (calls, own_time, cumulative_time, name))
+
+    allocations = sorted(solver_allocations(snapshot).items(), key=lambda item: -item[1][0])
+    lines += ["", "allocations still held, by solver function", "%10s  %10s  %s" % ("KiB", "blocks", "function")]
+    for name, (size, count) in allocations[:top]:
+        lines.append("%10.1f  %10d  %s" % (size / 1024.0, count, name))
+    lines += ["", "top allocation sites", "%10s  %10s  %s" % ("KiB", "blocks", "line")]
+    for statistic in snapshot.statistics("lineno")[:top]:
+        frame = statistic.traceback[0]
+        lines.append("%10.1f  %10d  %s:%d" % (statistic.size / 1024.0, statistic.count,
+                                              os.path.basename(frame.filename), frame.lineno))
+
+    summary = "\n".join(lines)
+    with open(output_prefix + ".txt", "w") as summary_file:
+        summary_file.write(summary + "\n")
+    print(summary)
+    return solution
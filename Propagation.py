@@ -0,0 +1,337 @@
+import timeit
+from itertools import combinations
+
+from BackTracking import COMBINATIONS, DIGITS, digits_of
+
+DIGIT_OF = {1 << d: d for d in DIGITS}
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+
+
+class KakuroConstraints:
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.clues = puzzle.clues
+        self.cells = []
+        self.index = {}
+        self.clue_cells = []
+        for clue in self.clues:
+            members = []
+            for cell in puzzle.get_cell_set(clue):
+                if cell.location not in self.index:
+                    self.index[cell.location] = len(self.cells)
+                    self.cells.append(cell.location)
+                members.append(self.index[cell.location])
+            self.clue_cells.append(members)
+
+        self.cell_clues = [[] for _ in self.cells]
+        for clue_index, members in enumerate(self.clue_cells):
+            for cell_index in members:
+                self.cell_clues[cell_index].append(clue_index)
+
+        self.clue_combinations = [COMBINATIONS.get((clue.goal_sum, clue.length), []) for clue in self.clues]
+
+    def clue_domains(self):
+        # the domains the clues allow on their own, with no given or entry narrowing them
+        return [self.puzzle.clue_only_domain(location) for location in self.cells]
+
+    def initial_domains(self):
+        domains = []
+        for row, col in self.cells:
+            cell = self.puzzle.puzzle[row][col]
+            domains.append(1 << cell.value if cell.value != 0 else cell.domain)
+        return domains
+
+
+def fixed_digits(domains, members):
+    # the digits already decided in the clue, or None when two cells share one
+    fixed = 0
+    for cell_index in members:
+        mask = domains[cell_index]
+        if mask & (mask - 1) == 0:
+            if mask == 0 or fixed & mask:
+                return None
+            fixed |= mask
+    return fixed
+
+
+def required_digits(propagator, clue_index, fixed):
+    # digits that appear in every combination still compatible with the decided digits and the domains
+    union = 0
+    for cell_index in propagator.constraints.clue_cells[clue_index]:
+        union |= propagator.domains[cell_index]
+    required = None
+    for combo in propagator.constraints.clue_combinations[clue_index]:
+        if combo & fixed == fixed and not combo & ~union:
+            required = combo if required is None else required & combo
+    return required
+
+
+class KakuroRule:
+    name = "rule"
+
+    def __init__(self):
+        self.calls = 0
+        self.removals = 0
+        self.wipeouts = 0
+        self.seconds = 0.0
+
+    def run(self, propagator, clue_index):
+        start = timeit.default_timer()
+        removed = propagator.removed
+        changed = self.apply(propagator, clue_index)
+        self.calls += 1
+        if changed is None:
+            self.wipeouts += 1
+        self.removals += propagator.removed - removed
+        self.seconds += timeit.default_timer() - start
+        return changed
+
+    def apply(self, propagator, clue_index):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"calls": self.calls, "removals": self.removals, "wipeouts": self.wipeouts, "seconds": self.seconds}
+
+
+class CombinationRule(KakuroRule):
+    name = "combination"
+
+    def apply(self, propagator, clue_index):
+        members = propagator.constraints.clue_cells[clue_index]
+        domains = propagator.domains
+        current = [domains[i] for i in members]
+
+        fixed = fixed_digits(domains, members)
+        if fixed is None:
+            return None
+        union = 0
+        for mask in current:
+            union |= mask
+
+        support = 0
+        for combo in propagator.constraints.clue_combinations[clue_index]:
+            if combo & fixed != fixed or combo & ~union:
+                continue
+            for mask in current:
+                if not mask & combo:
+                    break
+            else:
+                support |= combo
+        if not support:
+            return None
+
+        changed = []
+        for cell_index, mask in zip(members, current):
+            keep = support if mask & (mask - 1) == 0 else support & ~fixed
+            if propagator.restrict(cell_index, keep):
+                if not domains[cell_index]:
+                    return None
+                changed.append(cell_index)
+        return changed
+
+
+class NakedSubsetRule(KakuroRule):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self.name = {2: "naked pairs", 3: "naked triples"}.get(size, "naked %d-subsets" % size)
+
+    def apply(self, propagator, clue_index):
+        members = propagator.constraints.clue_cells[clue_index]
+        domains = propagator.domains
+        candidates = [i for i in members if 1 < POPCOUNT[domains[i]] <= self.size]
+        changed = []
+        for group in combinations(candidates, self.size):
+            union = 0
+            for cell_index in group:
+                union |= domains[cell_index]
+            if POPCOUNT[union] != self.size:
+                continue
+            for cell_index in members:
+                if cell_index not in group and propagator.restrict(cell_index, ~union):
+                    if not domains[cell_index]:
+                        return None
+                    changed.append(cell_index)
+        return changed
+
+
+class HiddenSingleRule(KakuroRule):
+    name = "hidden singles"
+
+    def apply(self, propagator, clue_index):
+        members = propagator.constraints.clue_cells[clue_index]
+        domains = propagator.domains
+        fixed = fixed_digits(domains, members)
+        if fixed is None:
+            return None
+        required = required_digits(propagator, clue_index, fixed)
+        if required is None:
+            return None
+        changed = []
+        for digit in digits_of(required & ~fixed):
+            bit = 1 << digit
+            places = [i for i in members if domains[i] & bit]
+            if not places:
+                return None
+            if len(places) == 1 and propagator.restrict(places[0], bit):
+                changed.append(places[0])
+        return changed
+
+
+class RequiredDigitRule(KakuroRule):
+    name = "required digits"
+
+    def apply(self, propagator, clue_index):
+        members = propagator.constraints.clue_cells[clue_index]
+        domains = propagator.domains
+        fixed = fixed_digits(domains, members)
+        if fixed is None:
+            return None
+        required = required_digits(propagator, clue_index, fixed)
+        if required is None:
+            return None
+        open_cells = [i for i in members if domains[i] & (domains[i] - 1)]
+        missing = required & ~fixed
+        if POPCOUNT[missing] > len(open_cells):
+            return None
+        changed = []
+        if POPCOUNT[missing] == len(open_cells):
+            # the open cells have to take exactly the required digits that are still missing
+            for cell_index in open_cells:
+                if propagator.restrict(cell_index, missing):
+                    if not domains[cell_index]:
+                        return None
+                    changed.append(cell_index)
+        return changed
+
+
+def default_rules():
+    return [CombinationRule()]
+
+
+def subset_rules():
+    return [NakedSubsetRule(2), NakedSubsetRule(3), HiddenSingleRule(), RequiredDigitRule()]
+
+
+class KakuroPropagator:
+    def __init__(self, constraints, domains=None, rules=None):
+        self.constraints = constraints
+        self.domains = list(domains) if domains is not None else constraints.initial_domains()
+        self.rules = rules if rules is not None else default_rules()
+        self.trail = []
+        self.nodes = 0
+        self.removed = 0
+
+    def mark(self):
+        return len(self.trail)
+
+    def undo(self, mark):
+        trail = self.trail
+        domains = self.domains
+        while len(trail) > mark:
+            cell_index, mask = trail.pop()
+            domains[cell_index] = mask
+
+    def assign(self, cell_index, digit):
+        mask = self.domains[cell_index]
+        bit = 1 << digit
+        if not mask & bit:
+            return False
+        if mask != bit:
+            self.trail.append((cell_index, mask))
+            self.domains[cell_index] = bit
+        return self.propagate(self.constraints.cell_clues[cell_index])
+
+    def propagate(self, clue_indices=None):
+        if clue_indices is None:
+            clue_indices = range(len(self.constraints.clues))
+        cell_clues = self.constraints.cell_clues
+        queue = list(clue_indices)
+        queued = set(queue)
+        while queue:
+            clue_index = queue.pop()
+            queued.discard(clue_index)
+            changed = self.revise(clue_index)
+            if changed is None:
+                return False
+            for cell_index in changed:
+                for other in cell_clues[cell_index]:
+                    if other not in queued:
+                        queued.add(other)
+                        queue.append(other)
+        return True
+
+    def restrict(self, cell_index, mask):
+        old_mask = self.domains[cell_index]
+        new_mask = old_mask & mask
+        if new_mask == old_mask:
+            return False
+        self.trail.append((cell_index, old_mask))
+        self.domains[cell_index] = new_mask
+        self.removed += POPCOUNT[old_mask] - POPCOUNT[new_mask]
+        return True
+
+    def revise(self, clue_index):
+        changed = []
+        for rule in self.rules:
+            rule_changed = rule.run(self, clue_index)
+            if rule_changed is None:
+                return None
+            changed.extend(rule_changed)
+        return changed
+
+    def rule_stats(self):
+        return {rule.name: rule.stats() for rule in self.rules}
+
+    def values(self):
+        return [DIGIT_OF.get(mask, 0) for mask in self.domains]
+
+    def choose_cell(self, cells):
+        best = None
+        best_count = 10
+        for cell_index in cells:
+            count = POPCOUNT[self.domains[cell_index]]
+            if 1 < count < best_count:
+                best = cell_index
+                best_count = count
+                if count == 2:
+                    break
+        return best
+
+    def solutions(self, cells=None):
+        # depth first search over the current domains, the propagator is restored when the generator closes
+        cells = list(range(len(self.domains))) if cells is None else list(cells)
+        base = self.mark()
+        stack = []
+        descend = True
+        try:
+            while True:
+                if descend:
+                    cell_index = self.choose_cell(cells)
+                    if cell_index is None:
+                        yield self.values()
+                    else:
+                        stack.append((cell_index, iter(digits_of(self.domains[cell_index])), self.mark()))
+                descend = False
+                while stack and not descend:
+                    cell_index, digits, mark = stack[-1]
+                    self.undo(mark)
+                    for digit in digits:
+                        self.nodes += 1
+                        if self.assign(cell_index, digit):
+                            descend = True
+                            break
+                        self.undo(mark)
+                    else:
+                        stack.pop()
+                if not descend:
+                    return
+        finally:
+            self.undo(base)
+
+    def solve(self, cells=None):
+        search = self.solutions(cells)
+        try:
+            return next(search, None)
+        finally:
+            search.close()
@@ -0,0 +1,84 @@
+import copy
+import random
+from itertools import count
+
+from BackTracking import PAUSED, SOLVED, IntelligentKakuroAgent, KakuroSearch
+
+
+def luby(i):
+    # i-th term (1-based) of 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if (1 << k) - 1 == i:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def luby_schedule(base):
+    for i in count(1):
+        yield base * luby(i)
+
+
+def geometric_schedule(base, factor=1.5):
+    limit = base
+    while True:
+        yield int(limit)
+        limit *= factor
+
+
+SCHEDULES = {
+    "luby": luby_schedule,
+    "geometric": geometric_schedule,
+}
+
+
+class RandomizedKakuroAgent(IntelligentKakuroAgent):
+    def __init__(self, puzzle, verbose=True, rng=None, rules=None):
+        super().__init__(puzzle, verbose, rules)
+        self.rng = rng if rng is not None else random.Random()
+
+    def select_unassigned_clue(self, assignment):
+        # same ranking as IntelligentKakuroAgent, ties are broken at random instead of by clue order
+        ranked = []
+        for clue in assignment.clues:
+            if not assignment.is_clue_assigned(clue):
+                unassigned_count = assignment.clue_unassigned_count(clue)
+                ranked.append(((unassigned_count == clue.length, unassigned_count), clue))
+        if not ranked:
+            return None
+        best = min(key for key, _ in ranked)
+        return self.rng.choice([clue for key, clue in ranked if key == best])
+
+    def frame_seed(self):
+        return self.rng.getrandbits(64)
+
+    def frame_values(self, clue, cell_set, assignment, seed):
+        # each frame shuffles with its own generator, so a checkpoint replays it from the seed and the agent's
+        # generator is drawn from only when a frame is pushed, never while its value sets are being tried
+        return self.order_domain_values(clue, cell_set, assignment, random.Random(seed))
+
+    def order_domain_values(self, clue, cell_set, assignment, rng=None):
+        return super().order_domain_values(clue, cell_set, assignment, rng if rng is not None else self.rng)
+
+
+def solve_with_restarts(puzzle, schedule="luby", base=100, seed=None, max_restarts=None,
+                        agent_class=RandomizedKakuroAgent):
+    agent = agent_class(puzzle, verbose=False, rng=random.Random(seed))
+    limits = SCHEDULES[schedule](base)
+    stats = {"seed": seed, "restarts": 0, "nodes": 0}
+    # the nogood store is kept across restarts, every nogood stays valid for the same puzzle
+    for restart, limit in enumerate(limits):
+        if max_restarts is not None and restart > max_restarts:
+            break
+        # a restart is counted when the run after a paused one starts
+        stats["restarts"] = restart
+        agent.nodes = 0
+        assignment = copy.deepcopy(puzzle)
+        status = KakuroSearch(agent, assignment).run(max_nodes=limit)
+        stats["nodes"] += agent.nodes
+        if status == PAUSED:
+            continue
+        return (assignment if status == SOLVED else None), stats
+    return None, stats
@@ -0,0 +1,141 @@
+from BackTracking import ALL_DIGITS, SUM_BOUNDS
+from Propagation import KakuroConstraints, KakuroPropagator, digits_of
+
+
+class KakuroSession:
+    def __init__(self, puzzle, rules=None):
+        self.puzzle = puzzle
+        self.constraints = KakuroConstraints(puzzle)
+        self.propagator = KakuroPropagator(self.constraints, self.constraints.clue_domains(), rules)
+        self.root_consistent = self.propagator.propagate()
+        # the domains with no entry at all, a cleared entry hands its cells back to these
+        self.base = list(self.propagator.domains)
+        self.values = {}
+        # entries whose propagation wiped out a domain, the domains hold the other entries only
+        self.blocked = set()
+        self.witness = None
+        self.unsolvable = False
+        self.conflicting = set()
+
+        for row, col in self.constraints.cells:
+            value = puzzle.puzzle[row][col].value
+            if value != 0:
+                self.set_value((row, col), value)
+
+    def set_value(self, location, value):
+        if value == 0:
+            self.clear_value(location)
+            return
+        cell_index = self.constraints.index[location]
+        if self.values.get(cell_index) == value:
+            return
+        if cell_index in self.values:
+            self.clear_value(location)
+
+        self.values[cell_index] = value
+        self.puzzle.puzzle[location[0]][location[1]].value = value
+        self.apply_entry(cell_index, value)
+        if self.witness is not None and self.witness[cell_index] != value:
+            self.witness = None
+        self.update_conflicts(cell_index)
+
+    def clear_value(self, location):
+        cell_index = self.constraints.index[location]
+        if cell_index not in self.values:
+            return
+        del self.values[cell_index]
+        self.unsolvable = False
+        self.puzzle.puzzle[location[0]][location[1]].value = 0
+        if cell_index in self.blocked:
+            # never propagated, so the domains do not change
+            self.blocked.discard(cell_index)
+        elif self.root_consistent:
+            self.loosen(cell_index)
+            for other_index in sorted(self.blocked):
+                self.blocked.discard(other_index)
+                self.apply_entry(other_index, self.values[other_index])
+        self.update_conflicts(cell_index)
+
+    def apply_entry(self, cell_index, digit):
+        if not self.root_consistent:
+            return
+        propagator = self.propagator
+        mark = propagator.mark()
+        if not propagator.assign(cell_index, digit):
+            propagator.undo(mark)
+            self.blocked.add(cell_index)
+        # the session never goes back to an earlier state through the trail
+        del propagator.trail[:]
+
+    def loosen(self, cell_index):
+        # whatever the cleared entry narrowed is linked to it through clues over narrowed cells, everything
+        # outside that region keeps its domain and only the region is propagated again
+        constraints = self.constraints
+        domains = self.propagator.domains
+        base = self.base
+        region = {cell_index}
+        queue = [cell_index]
+        clue_indices = set()
+        while queue:
+            current = queue.pop()
+            for clue_index in constraints.cell_clues[current]:
+                if clue_index in clue_indices:
+                    continue
+                clue_indices.add(clue_index)
+                for other in constraints.clue_cells[clue_index]:
+                    if other not in region and domains[other] != base[other]:
+                        region.add(other)
+                        queue.append(other)
+        for other in region:
+            digit = self.values.get(other)
+            domains[other] = 1 << digit if digit is not None and other not in self.blocked else base[other]
+        # the remaining entries held together with the cleared one, so they cannot wipe out a domain now
+        self.propagator.propagate(clue_indices)
+        del self.propagator.trail[:]
+
+    def update_conflicts(self, cell_index):
+        for clue_index in self.constraints.cell_clues[cell_index]:
+            if self.clue_in_conflict(clue_index):
+                self.conflicting.add(clue_index)
+            else:
+                self.conflicting.discard(clue_index)
+
+    def clue_in_conflict(self, clue_index):
+        clue = self.constraints.clues[clue_index]
+        members = self.constraints.clue_cells[clue_index]
+        seen = 0
+        total = 0
+        filled = 0
+        for cell_index in members:
+            digit = self.values.get(cell_index)
+            if digit is None:
+                continue
+            if seen & (1 << digit):
+                return True
+            seen |= 1 << digit
+            total += digit
+            filled += 1
+        bounds = SUM_BOUNDS[ALL_DIGITS & ~seen][len(members) - filled]
+        return bounds is None or not bounds[0] <= clue.goal_sum - total <= bounds[1]
+
+    def conflicts(self):
+        return [self.constraints.clues[clue_index] for clue_index in sorted(self.conflicting)]
+
+    def is_solvable(self):
+        if not self.root_consistent or self.blocked or self.unsolvable:
+            return False
+        if self.witness is None:
+            self.witness = self.propagator.solve()
+            self.unsolvable = self.witness is None
+        return self.witness is not None
+
+    def solution(self):
+        if not self.is_solvable():
+            return None
+        return {location: self.witness[cell_index] for cell_index, location in enumerate(self.constraints.cells)}
+
+    def candidates(self, location):
+        if not self.root_consistent or self.blocked:
+            return []
+        mask = self.propagator.domains[self.constraints.index[location]]
+        return digits_of(mask)
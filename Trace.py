@@ -0,0 +1,179 @@
+import copy
+import heapq
+import struct
+
+from BackTracking import IntelligentKakuroAgent, KakuroSearch
+
+TRACE_MAGIC = b'KKTR'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sBB')
+# event, reason, depth, clue index, node count when the event happened, value sets tried by the frame so far
+TRACE_RECORD = struct.Struct('<BBHHII')
+
+PUSH = 1
+TRY = 2
+PRUNE = 3
+BACKTRACK = 4
+SOLVED = 5
+
+EVENT_NAMES = {PUSH: 'push', TRY: 'try', PRUNE: 'prune', BACKTRACK: 'backtrack', SOLVED: 'solved'}
+REASONS = {'violation': 1, 'nogood': 2, 'discrepancy': 3, 'exhausted': 4, 'backjump': 5}
+REASON_NAMES = {code: name for name, code in REASONS.items()}
+
+
+class KakuroTraceRecorder:
+    # fixed-size records collected in a preallocated buffer, the file is only written when it fills up
+    def __init__(self, path, buffer_records=4096):
+        self.file = open(path, 'wb')
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, TRACE_RECORD.size))
+        self.buffer = bytearray(TRACE_RECORD.size * buffer_records)
+        self.position = 0
+        self.records = 0
+        self.search = None
+        self.clue_indices = {}
+
+    def attach(self, search):
+        self.search = search
+        self.clue_indices = {clue: index for index, clue in enumerate(search.assignment.clues)}
+        search.trace = self
+
+    def write(self, event, reason, depth, clue, tried=0):
+        if self.position == len(self.buffer):
+            self.flush()
+        TRACE_RECORD.pack_into(self.buffer, self.position, event, reason, depth,
+                               self.clue_indices.get(clue, 0xFFFF), self.search.agent.nodes, tried)
+        self.position += TRACE_RECORD.size
+        self.records += 1
+
+    def push(self, depth, clue):
+        self.write(PUSH, 0, depth, clue)
+
+    def try_value_set(self, depth, clue, tried):
+        self.write(TRY, 0, depth, clue, tried)
+
+    def prune(self, depth, clue, tried, reason):
+        self.write(PRUNE, REASONS[reason], depth, clue, tried)
+
+    def backtrack(self, depth, clue, reason):
+        self.write(BACKTRACK, REASONS[reason], depth, clue)
+
+    def solved(self, depth):
+        self.write(SOLVED, 0, depth, None)
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.position])
+        self.position = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        if self.search is not None and self.search.trace is self:
+            self.search.trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record_search(puzzle, path, agent_class=IntelligentKakuroAgent, max_nodes=None, buffer_records=4096):
+    # runs one search on a copy of the puzzle and writes its trace, returns the status and the assignment
+    agent = agent_class(puzzle, verbose=False)
+    search = KakuroSearch(agent, copy.deepcopy(puzzle))
+    with KakuroTraceRecorder(path, buffer_records) as recorder:
+        recorder.attach(search)
+        status = search.run(max_nodes)
+    return status, search.assignment
+
+
+def read_trace(path):
+    with open(path, 'rb') as trace_file:
+        data = trace_file.read()
+    magic, version, record_size = TRACE_HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC:
+        raise ValueError('not a kakuro trace file: %s' % path)
+    if version != TRACE_VERSION or record_size != TRACE_RECORD.size:
+        raise ValueError('%s is a version %d trace, this reader only reads version %d' % (path, version, TRACE_VERSION))
+    return TRACE_RECORD.iter_unpack(memoryview(data)[TRACE_HEADER.size:])
+
+
+class KakuroTraceNode:
+    def __init__(self, depth, clue_index, node, parent):
+        self.depth = depth
+        self.clue_index = clue_index
+        self.node = node
+        self.parent = parent
+        self.children = 0
+        self.tries = 0
+        self.prunes = 0
+        # search nodes entered from the push of this frame until it was popped
+        self.cost = 0
+        self.reason = None
+
+
+class KakuroTraceAnalyzer:
+    def __init__(self, path):
+        self.frames = []
+        self.solutions = []
+        self.prune_reasons = {}
+        stack = []
+        last_node = 0
+        for event, reason, depth, clue_index, node, tried in read_trace(path):
+            last_node = node
+            if event == PUSH:
+                while len(stack) > depth:
+                    self.close(stack.pop(), node, None)
+                parent = stack[-1] if stack else None
+                frame = KakuroTraceNode(depth, clue_index, node, parent)
+                if parent is not None:
+                    parent.children += 1
+                stack.append(frame)
+                self.frames.append(frame)
+            elif event == TRY:
+                stack[depth].tries += 1
+            elif event == PRUNE:
+                stack[depth].prunes += 1
+                counts = self.prune_reasons.setdefault(depth, {})
+                counts[REASON_NAMES[reason]] = counts.get(REASON_NAMES[reason], 0) + 1
+            elif event == BACKTRACK:
+                while len(stack) > depth:
+                    frame = stack.pop()
+                    self.close(frame, node, REASON_NAMES[reason] if frame.depth == depth else None)
+            elif event == SOLVED:
+                self.solutions.append((node, depth))
+        while stack:
+            self.close(stack.pop(), last_node, None)
+
+    def close(self, frame, node, reason):
+        frame.cost = node - frame.node + 1
+        frame.reason = reason
+
+    def branching(self):
+        # per depth: frames pushed, value sets descended into, mean branching factor and prunes by reason
+        levels = {}
+        for frame in self.frames:
+            level = levels.setdefault(frame.depth, {'frames': 0, 'tries': 0, 'prunes': 0})
+            level['frames'] += 1
+            level['tries'] += frame.tries
+            level['prunes'] += frame.prunes
+        for depth, level in levels.items():
+            level['branching'] = level['tries'] / level['frames']
+            level['prune_reasons'] = self.prune_reasons.get(depth, {})
+        return dict(sorted(levels.items()))
+
+    def expensive_subtrees(self, count=10):
+        return heapq.nlargest(count, self.frames, key=lambda frame: frame.cost)
+
+    def report(self, count=10):
+        lines = ['%d frames, %d solutions' % (len(self.frames), len(self.solutions)), '',
+                 'depth  frames  branching  prunes  reasons']
+        for depth, level in self.branching().items():
+            reasons = ', '.join('%s %d' % item for item in sorted(level['prune_reasons'].items()))
+            lines.append('%5d  %6d  %9.2f  %6d  %s' % (depth, level['frames'], level['branching'],
+                                                       level['prunes'], reasons))
+        lines += ['', 'most expensive subtrees', 'nodes  depth  clue  entered at  tries  prunes  left by']
+        for frame in self.expensive_subtrees(count):
+            lines.append('%5d  %5d  %4d  %10d  %5d  %6d  %s' % (frame.cost, frame.depth, frame.clue_index, frame.node,
+                                                             frame.tries, frame.prunes, frame.reason or '-'))
+        return '\n'.join(lines)
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+
+import pytest
+
+TESTS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIRECTORY))
+
+from BackTracking import DOWN, RIGHT, KakuroBlackCell, KakuroClue, KakuroClueCell, KakuroPuzzle, sample_puzzle
+
+BASELINE_PATH = os.path.join(TESTS_DIRECTORY, "baselines.json")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baselines", action="store_true", default=False,
+                     help="rewrite tests/baselines.json from the results of this run")
+
+
+class Baselines:
+    def __init__(self, path, update):
+        self.path = path
+        self.update = update
+        if os.path.exists(path):
+            with open(path) as baseline_file:
+                self.data = json.load(baseline_file)
+        else:
+            self.data = {"node_tolerance": 0.0, "time_tolerance": 3.0, "cases": {}}
+        self.results = {}
+
+    def case(self, name):
+        return self.data["cases"].get(name)
+
+    def record(self, name, result):
+        self.results[name] = result
+
+    def save(self):
+        self.data["cases"].update(self.results)
+        with open(self.path, "w") as baseline_file:
+            json.dump(self.data, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    store = Baselines(BASELINE_PATH, request.config.getoption("--update-baselines"))
+    yield store
+    if store.update:
+        store.save()
+
+
+@pytest.fixture(scope="session")
+def sample_board():
+    # builds a fresh sample board on every call without printing it, so a test may change what it gets
+    def build(choice):
+        return sample_puzzle(choice, verbose=False)
+    return build
+
+
+@pytest.fixture(scope="session")
+def square_board():
+    # a 2x2 square, with the default sums of 10 it has the eight solutions a, 10 - a / 10 - a, a for a != 5
+    def build(*white_cells, sums=(10, 10, 10, 10)):
+        cells = [KakuroBlackCell((0, 0)),
+                 KakuroClueCell((0, 1), KakuroClue(DOWN, 2, sums[0]), None),
+                 KakuroClueCell((0, 2), KakuroClue(DOWN, 2, sums[1]), None),
+                 KakuroClueCell((1, 0), None, KakuroClue(RIGHT, 2, sums[2])),
+                 KakuroClueCell((2, 0), None, KakuroClue(RIGHT, 2, sums[3]))]
+        return KakuroPuzzle(3, 3, cells + list(white_cells), verbose=False)
+    return build
+
+
+@pytest.fixture(scope="session")
+def square_row():
+    # 2x2 squares side by side, one per tuple of sums, no clue crosses from one square into the next
+    def build(*square_sums):
+        cells = []
+        for index, sums in enumerate(square_sums):
+            col = 3 * index
+            cells += [KakuroBlackCell((0, col)),
+                      KakuroClueCell((0, col + 1), KakuroClue(DOWN, 2, sums[0]), None),
+                      KakuroClueCell((0, col + 2), KakuroClue(DOWN, 2, sums[1]), None),
+                      KakuroClueCell((1, col), None, KakuroClue(RIGHT, 2, sums[2])),
+                      KakuroClueCell((2, col), None, KakuroClue(RIGHT, 2, sums[3]))]
+        return KakuroPuzzle(3, 3 * len(square_sums), cells, verbose=False)
+    return build
@@ -0,0 +1,36 @@
+import pytest
+
+from BackTracking import IntelligentKakuroAgent
+from BatchValidation import KakuroBatchValidator, np
+
+BACKENDS = [False] + ([True] if np is not None else [])
+
+
+@pytest.fixture(scope="module")
+def board(sample_board):
+    puzzle = sample_board("1")
+    solution = IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle)
+    return puzzle, solution
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_accepts_every_input_shape(board, use_numpy):
+    puzzle, solution = board
+    validator = KakuroBatchValidator(puzzle, use_numpy=use_numpy)
+    flat = list(solution.value_buffer())
+    grid = [flat[row * puzzle.width:(row + 1) * puzzle.width] for row in range(puzzle.height)]
+    assert validator.validate([solution, solution.value_buffer(), flat, grid]) == [True] * 4
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_out_of_range_values_do_not_wrap(board, use_numpy):
+    puzzle, solution = board
+    validator = KakuroBatchValidator(puzzle, use_numpy=use_numpy)
+    flat = list(solution.value_buffer())
+    wrapped = list(flat)
+    wrapped[validator.white[0]] += 256
+    negative = list(flat)
+    negative[validator.white[0]] = -flat[validator.white[0]]
+    assert validator.validate([flat, wrapped, negative]) == [True, False, False]
+    if np is not None:
+        assert validator.validate(np.array([flat, wrapped])) == [True, False]
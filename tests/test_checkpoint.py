@@ -0,0 +1,58 @@
+import copy
+import random
+
+import pytest
+
+from BackTracking import EXHAUSTED, PAUSED, SOLVED, IntelligentKakuroAgent, KakuroSearch
+from Restarts import RandomizedKakuroAgent
+
+
+def all_solutions(search, checkpoint_path=None):
+    # pauses every few nodes and, with a path, goes on from a checkpoint written at each pause
+    solutions = []
+    while True:
+        status = search.run(max_nodes=2)
+        if status == SOLVED:
+            solutions.append(search.assignment.value_buffer())
+        elif status == EXHAUSTED:
+            return solutions
+        elif checkpoint_path is not None:
+            assert status == PAUSED
+            search.save_checkpoint(checkpoint_path)
+            search = KakuroSearch.load_checkpoint(checkpoint_path)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_randomized_resume_matches_uninterrupted_run(seed, square_board, tmp_path):
+    puzzle = square_board()
+    agent = RandomizedKakuroAgent(puzzle, verbose=False, rng=random.Random(seed))
+    uninterrupted = all_solutions(KakuroSearch(agent, copy.deepcopy(puzzle)))
+    assert len(set(uninterrupted)) == 8
+
+    agent = RandomizedKakuroAgent(puzzle, verbose=False, rng=random.Random(seed))
+    resumed = all_solutions(KakuroSearch(agent, copy.deepcopy(puzzle)), str(tmp_path / "search.ckpt"))
+    assert resumed == uninterrupted
+
+
+def test_deterministic_resume_replays_the_same_order(square_board, tmp_path):
+    puzzle = square_board()
+    uninterrupted = all_solutions(KakuroSearch(IntelligentKakuroAgent(puzzle, verbose=False), copy.deepcopy(puzzle)))
+    resumed = all_solutions(KakuroSearch(IntelligentKakuroAgent(puzzle, verbose=False), copy.deepcopy(puzzle)),
+                            str(tmp_path / "search.ckpt"))
+    assert resumed == uninterrupted
+
+
+def test_writing_checkpoints_leaves_a_seeded_run_unchanged(sample_board, tmp_path):
+    puzzle = sample_board("4")
+    path = str(tmp_path / "search.ckpt")
+    runs = []
+    for mode in ("uninterrupted", "saved", "resumed"):
+        agent = RandomizedKakuroAgent(puzzle, verbose=False, rng=random.Random(3))
+        search = KakuroSearch(agent, copy.deepcopy(puzzle))
+        while search.run(max_nodes=None if mode == "uninterrupted" else 3) == PAUSED:
+            search.save_checkpoint(path)
+            if mode == "resumed":
+                search = KakuroSearch.load_checkpoint(path)
+        assert search.status == SOLVED
+        runs.append((search.agent.nodes, search.assignment.value_buffer()))
+    assert runs[0] == runs[1] == runs[2]
@@ -0,0 +1,189 @@
+import multiprocessing
+import os
+
+import pytest
+
+import Corpus
+from BackTracking import CLUE, WHITE, IntelligentKakuroAgent, KakuroPuzzle, KakuroWhiteCell
+from Corpus import (FAILED, PENDING, SOLVED, KakuroCorpus, KakuroCorpusFile, KakuroSharedCorpus, build_record,
+                    decode_puzzle, encode_puzzle, pack_puzzle, parse_record, solve_corpus, solve_index, unpack_puzzle,
+                    write_corpus)
+
+CODECS = [(encode_puzzle, decode_puzzle), (pack_puzzle, unpack_puzzle)]
+
+
+def with_givens(puzzle, givens, entries=None):
+    cells = [cell for row in puzzle.puzzle for cell in row if cell.category != WHITE]
+    cells += [KakuroWhiteCell(location, value) for location, value in givens.items()]
+    cells += [KakuroWhiteCell(location, value, given=False) for location, value in (entries or {}).items()]
+    return KakuroPuzzle(puzzle.height, puzzle.width, cells, verbose=False)
+
+
+@pytest.mark.parametrize("encode, decode", CODECS)
+def test_givens_survive_a_roundtrip(encode, decode, sample_board):
+    # the down clue over (1, 3) and (2, 3) sums to 17, a given 9 leaves 8 for the other cell
+    puzzle = with_givens(sample_board("4"), {(1, 3): 9})
+    decoded = decode(encode(puzzle))
+    assert decoded.givens == {(1, 3)}
+    assert decoded.puzzle[1][3].value == 9
+    assert decoded.puzzle[1][3].domain == 1 << 9
+    assert decoded.puzzle[2][3].domain == 1 << 8
+
+
+@pytest.mark.parametrize("encode, decode", CODECS)
+def test_entries_are_not_written_as_givens(encode, decode, sample_board):
+    puzzle = with_givens(sample_board("4"), {(1, 3): 9}, {(1, 4): 7})
+    decoded = decode(encode(puzzle))
+    assert decoded.givens == {(1, 3)}
+    assert decoded.puzzle[1][4].value == 0
+    assert decoded.puzzle[1][4].domain == with_givens(sample_board("4"), {(1, 3): 9}).puzzle[1][4].domain
+
+
+@pytest.mark.parametrize("encode, decode", CODECS)
+def test_clashing_entries_roundtrip_as_an_empty_board(encode, decode, sample_board):
+    # the two entries repeat a digit in the down clue at (0, 3), as givens they could not be loaded
+    puzzle = with_givens(sample_board("4"), {}, {(1, 3): 9, (2, 3): 9})
+    decoded = decode(encode(puzzle))
+    assert decoded.givens == set()
+    assert layout(decoded) == layout(sample_board("4"))
+
+
+def layout(puzzle):
+    # everything a record has to carry, cell by cell
+    cells = []
+    for row in puzzle.puzzle:
+        for cell in row:
+            if cell.category == WHITE:
+                cells.append((WHITE, cell.value))
+            elif cell.category == CLUE:
+                cells.append((CLUE, clue_key(cell.down_clue), clue_key(cell.right_clue)))
+            else:
+                cells.append((cell.category,))
+    return puzzle.height, puzzle.width, cells
+
+
+def clue_key(clue):
+    return (clue.direction, clue.length, clue.goal_sum) if clue is not None else None
+
+
+@pytest.fixture(scope="module")
+def boards(sample_board):
+    return [sample_board(choice) for choice in "1234"]
+
+
+def test_byte_records_roundtrip(boards):
+    for puzzle in boards:
+        record = encode_puzzle(puzzle)
+        assert len(record) == 2 + 5 * puzzle.height * puzzle.width
+        assert layout(decode_puzzle(record)) == layout(puzzle)
+
+
+def test_corpus_buffer_hands_out_each_record(boards):
+    corpus = KakuroCorpus(KakuroCorpus.pack(boards))
+    assert len(corpus) == len(boards)
+    for index, puzzle in enumerate(boards):
+        assert corpus.dimensions(index) == (puzzle.height, puzzle.width)
+        assert bytes(corpus.record(index)) == bytes(encode_puzzle(puzzle))
+        assert layout(corpus.puzzle(index)) == layout(puzzle)
+    corpus.release()
+
+
+def test_corpus_buffer_has_64_bit_offsets(boards):
+    data = KakuroCorpus.pack(boards)
+    corpus = KakuroCorpus(data)
+    assert corpus.offsets.format == 'Q' and len(corpus.offsets) == len(boards) + 1
+    assert corpus.offsets[0] == 8 * (len(boards) + 2) and corpus.offsets[-1] == len(data)
+    corpus.release()
+
+
+def test_shared_corpus_is_visible_to_an_attached_handle(boards):
+    with KakuroSharedCorpus.create(boards) as shared:
+        attached = KakuroSharedCorpus.attach(*shared.names)
+        try:
+            assert layout(attached.corpus.puzzle(2)) == layout(boards[2])
+            values = bytes(range(boards[1].height * boards[1].width))
+            attached.results.store(1, SOLVED, values)
+            assert shared.results.status(1) == SOLVED and shared.results.values(1) == values
+            assert shared.results.status(0) == PENDING
+        finally:
+            attached.close()
+
+
+def test_solve_corpus_in_worker_processes(boards):
+    results = solve_corpus(boards[:2], workers=2)
+    for puzzle, (status, values) in zip(boards, results):
+        assert status == SOLVED
+        assert values == IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle).value_buffer()
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the patched close only reaches forked workers")
+def test_workers_close_their_handles_on_exit(boards, monkeypatch, tmp_path):
+    close = KakuroSharedCorpus.close
+
+    def recording_close(self):
+        close(self)
+        (tmp_path / str(os.getpid())).touch()
+
+    monkeypatch.setattr(KakuroSharedCorpus, "close", recording_close)
+    solve_corpus(boards[:2], workers=2)
+    assert {int(name) for name in os.listdir(tmp_path)} - {os.getpid()}
+
+
+class SmallBoardsFailAgent(IntelligentKakuroAgent):
+    def backtracking_search(self, puzzle):
+        if puzzle.height < 10:
+            raise RuntimeError("no small boards")
+        return super().backtracking_search(puzzle)
+
+
+def test_a_failing_solve_does_not_lose_the_batch(boards):
+    results = solve_corpus(boards, workers=2, agent_class=SmallBoardsFailAgent)
+    assert [status for status, _ in results] == [FAILED, FAILED, SOLVED, SOLVED]
+
+
+def test_a_record_that_does_not_decode_is_failed(boards, monkeypatch):
+    with KakuroSharedCorpus.create(boards[:2]) as shared:
+        # a height the record has no cells for
+        shared.corpus.buffer[shared.corpus.offsets[1]] = 200
+        monkeypatch.setattr(Corpus, "worker_corpus", shared)
+        assert [solve_index(index, IntelligentKakuroAgent) for index in range(2)] == [0, 1]
+        assert [shared.results.status(index) for index in range(2)] == [SOLVED, FAILED]
+
+
+def test_packed_records_roundtrip(boards):
+    for puzzle in boards:
+        record = pack_puzzle(puzzle)
+        assert len(record) < len(encode_puzzle(puzzle))
+        assert layout(unpack_puzzle(record)) == layout(puzzle)
+        height, width, kinds, clues, values = parse_record(record)
+        assert build_record(height, width, kinds, clues, values) == record
+
+
+@pytest.mark.parametrize("encode, decode", CODECS)
+def test_template_clues_keep_their_open_sums(encode, decode, square_board):
+    # the generator starts from clues whose sums are still open
+    puzzle = square_board(sums=(None, None, None, None))
+    decoded = decode(encode(puzzle))
+    assert [clue.goal_sum for clue in decoded.clues] == [None] * 4
+    assert layout(decoded) == layout(puzzle)
+
+
+def test_corpus_file_reads_back_through_the_memory_map(boards, tmp_path):
+    path = str(tmp_path / "boards.kkrc")
+    write_corpus(path, boards)
+    with KakuroCorpusFile(path) as corpus:
+        assert len(corpus) == len(boards)
+        for index, puzzle in enumerate(boards):
+            assert corpus.record(index) == pack_puzzle(puzzle)
+        assert [layout(puzzle) for puzzle in corpus] == [layout(puzzle) for puzzle in boards]
+        with pytest.raises(IndexError):
+            corpus.record(len(boards))
+
+
+def test_corpus_file_rejects_other_files(tmp_path):
+    path = str(tmp_path / "other.bin")
+    with open(path, 'wb') as other_file:
+        other_file.write(bytes(64))
+    with pytest.raises(ValueError):
+        KakuroCorpusFile(path)
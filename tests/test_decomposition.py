@@ -0,0 +1,62 @@
+import pytest
+
+from BackTracking import DOWN, RIGHT, IntelligentKakuroAgent, KakuroBlackCell, KakuroClue, KakuroClueCell, KakuroPuzzle
+from Decomposition import KakuroDecomposition, batch_components
+
+TENS = (10, 10, 10, 10)
+
+
+def path_board():
+    # the top row crosses both columns, the bottom cells are only in their column, so the crossing graph is a path
+    cells = [KakuroBlackCell((0, 0)),
+             KakuroClueCell((0, 1), KakuroClue(DOWN, 2, 10), None),
+             KakuroClueCell((0, 2), KakuroClue(DOWN, 2, 10), None),
+             KakuroClueCell((1, 0), None, KakuroClue(RIGHT, 2, 10)),
+             KakuroBlackCell((2, 0))]
+    return KakuroPuzzle(3, 3, cells, verbose=False)
+
+
+def test_each_square_is_a_component(square_row):
+    decomposition = KakuroDecomposition(square_row(TENS, (9, 11, 10, 10), (12, 8, 11, 9)))
+    assert sorted(map(sorted, decomposition.component_locations())) == \
+        [[(row, col + 3 * index) for row in (1, 2) for col in (1, 2)] for index in range(3)]
+    assert decomposition.articulation_cells == []
+
+
+def test_decided_cells_join_no_component(square_row):
+    # a square of threes and fours has one solution, propagation decides it before any component is formed
+    decomposition = KakuroDecomposition(square_row(TENS, (3, 4, 4, 3)))
+    assert len(decomposition.components) == 1
+
+
+def test_the_cells_of_a_path_are_bridges():
+    decomposition = KakuroDecomposition(path_board())
+    assert len(decomposition.components) == 1
+    assert sorted(decomposition.articulation_cells) == [(1, 1), (1, 2)]
+    solution = decomposition.solve()
+    assert solution.is_complete() and solution.is_consistent()
+
+
+def test_batches_share_out_every_component():
+    components = [[index] * size for index, size in enumerate([1, 5, 3, 2, 4])]
+    batches = batch_components(components, 2)
+    assert sorted(map(len, batches)) == [2, 3]
+    assert sorted(component for batch in batches for component in batch) == sorted(components)
+    assert len(batch_components(components[:1], 4)) == 1
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_parallel_and_sequential_solves_agree(square_row, workers):
+    puzzle = square_row(*[TENS, (9, 11, 10, 10), (12, 8, 11, 9), (8, 12, 9, 11)] * 3)
+    decomposition = KakuroDecomposition(puzzle)
+    assert len(decomposition.components) == 12
+    solution = decomposition.solve(workers)
+    assert solution.is_complete() and solution.is_consistent()
+    assert solution.value_buffer() == KakuroDecomposition(puzzle).solve().value_buffer()
+
+
+def test_an_unsolvable_component_fails_the_board(square_row):
+    puzzle = square_row(TENS, (10, 10, 10, 11))
+    assert KakuroDecomposition(puzzle).solve() is None
+    assert KakuroDecomposition(puzzle).solve(workers=2) is None
+    assert IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle) is None
@@ -0,0 +1,54 @@
+import pytest
+
+from BackTracking import WHITE, KakuroPuzzle, KakuroWhiteCell
+from Corpus import KakuroCorpusFile, pack_puzzle, unpack_puzzle, write_corpus
+from Dedupe import (canonical_form, canonical_hash, dedupe_corpus_file, dedupe_puzzles, record_hash,
+                    transpose_record)
+
+
+@pytest.fixture(scope="module")
+def boards(sample_board):
+    return [sample_board(choice) for choice in "1234"]
+
+
+def transposed(puzzle):
+    return unpack_puzzle(transpose_record(pack_puzzle(puzzle)))
+
+
+def test_transpose_is_an_involution(boards):
+    for puzzle in boards:
+        record = pack_puzzle(puzzle)
+        assert transpose_record(transpose_record(record)) == record
+        assert transpose_record(record) != record
+
+
+def test_a_board_and_its_transpose_share_a_hash(boards):
+    for puzzle in boards:
+        flipped = transposed(puzzle)
+        assert (flipped.height, flipped.width) == (puzzle.width, puzzle.height)
+        assert canonical_form(flipped) == canonical_form(puzzle)
+        assert canonical_hash(flipped) == canonical_hash(puzzle)
+    assert len({canonical_hash(puzzle) for puzzle in boards}) == len(boards)
+
+
+def test_dedupe_keeps_one_record_per_board(boards, tmp_path):
+    puzzles = boards + [transposed(puzzle) for puzzle in boards] + boards[:2]
+    output = str(tmp_path / "unique.kkrc")
+    assert dedupe_puzzles(puzzles, output, bucket_count=3) == {"read": len(puzzles), "unique": len(boards)}
+    with KakuroCorpusFile(output) as corpus:
+        hashes = sorted(record_hash(corpus.record(index)) for index in range(len(corpus)))
+    assert hashes == sorted(canonical_hash(puzzle) for puzzle in boards)
+
+
+def test_dedupe_corpus_file_works_on_the_records(boards, tmp_path):
+    source = str(tmp_path / "source.kkrc")
+    write_corpus(source, boards * 3)
+    output = str(tmp_path / "unique.kkrc")
+    assert dedupe_corpus_file(source, output, bucket_count=2) == {"read": 3 * len(boards), "unique": len(boards)}
+
+
+def test_entries_do_not_change_the_hash(boards):
+    puzzle = boards[3]
+    cells = [cell for row in puzzle.puzzle for cell in row if cell.category != WHITE]
+    played = KakuroPuzzle(puzzle.height, puzzle.width, cells + [KakuroWhiteCell((1, 3), 9, given=False)], verbose=False)
+    assert canonical_hash(played) == canonical_hash(puzzle)
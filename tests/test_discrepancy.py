@@ -0,0 +1,62 @@
+import pytest
+
+from BackTracking import IntelligentKakuroAgent, KakuroAgent
+from Discrepancy import LeastConstrainingKakuroAgent, limited_discrepancy_search
+from Propagation import POPCOUNT
+
+AGENTS = [KakuroAgent, IntelligentKakuroAgent, LeastConstrainingKakuroAgent]
+
+
+@pytest.mark.parametrize("agent_class", AGENTS)
+@pytest.mark.parametrize("choice", ["1", "2", "3", "4"])
+def test_matches_depth_first_search(agent_class, choice, sample_board):
+    puzzle = sample_board(choice)
+    solution, stats = limited_discrepancy_search(puzzle, agent_class)
+    expected = agent_class(puzzle, verbose=False).backtracking_search(puzzle)
+    assert solution.is_complete() and solution.is_consistent()
+    # the sample boards have one solution each
+    assert solution.value_buffer() == expected.value_buffer()
+    assert stats["iterations"] == stats["discrepancies"] + 1 == len(stats["iteration_nodes"])
+    assert sum(stats["iteration_nodes"]) == stats["nodes"]
+
+
+def test_an_unsolvable_board_ends_with_a_complete_iteration(square_board):
+    solution, stats = limited_discrepancy_search(square_board(sums=(10, 10, 10, 11)))
+    assert solution is None
+    assert not stats["timed_out"]
+
+
+@pytest.mark.parametrize("agent_class", [KakuroAgent, IntelligentKakuroAgent])
+def test_a_board_off_the_first_path_needs_a_discrepancy(agent_class, square_board):
+    puzzle = square_board(sums=(3, 8, 5, 6))
+    solution, stats = limited_discrepancy_search(puzzle, agent_class, max_discrepancies=0)
+    assert solution is None and stats["discrepancies"] == 0
+
+    solution, stats = limited_discrepancy_search(puzzle, agent_class)
+    assert solution.is_complete() and solution.is_consistent()
+    assert stats["discrepancies"] == 1
+    # the second iteration walks the first path again before it takes its discrepancy
+    assert stats["iteration_nodes"][1] > stats["iteration_nodes"][0]
+
+
+def test_only_a_prefix_of_the_value_sets_is_scored(sample_board):
+    puzzle = sample_board("4")
+    agent = LeastConstrainingKakuroAgent(puzzle, verbose=False)
+    agent.scored_value_sets = 5
+
+    def freedom(clue, value_set):
+        puzzle.assign_clue(clue, value_set)
+        crossings = {other for cell in puzzle.get_cell_set(clue) for other in puzzle.cell_clues[cell.location]}
+        total = sum(POPCOUNT[puzzle.clue_domain(other)] for other in crossings if other is not clue)
+        for cell in puzzle.get_cell_set(clue):
+            cell.value = 0
+        return total
+
+    for clue in puzzle.clues:
+        cell_set = puzzle.get_cell_set(clue)
+        base = list(IntelligentKakuroAgent.order_domain_values(agent, clue, cell_set, puzzle))
+        ordered = list(agent.order_domain_values(clue, cell_set, puzzle))
+        assert sorted(ordered) == sorted(base)
+        assert ordered[5:] == base[5:]
+        scores = [freedom(clue, value_set) for value_set in ordered[:5]]
+        assert scores == sorted(scores, reverse=True)
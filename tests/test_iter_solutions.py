@@ -0,0 +1,41 @@
+import itertools
+
+from BackTracking import DIGITS, IntelligentKakuroAgent, iter_solutions
+
+
+class CountingAgent(IntelligentKakuroAgent):
+    # keeps every agent iter_solutions makes, so a test can read the nodes it visited
+    made = []
+
+    def __init__(self, puzzle, verbose=True, rules=None):
+        super().__init__(puzzle, verbose, rules)
+        CountingAgent.made.append(self)
+
+
+def brute_force_square(sums):
+    # every filling of the 2x2 square, the down runs are the columns and the right runs the rows
+    solutions = set()
+    for a, b, c, d in itertools.product(DIGITS, repeat=4):
+        if a != c and b != d and a != b and c != d and (a + c, b + d, a + b, c + d) == sums:
+            solutions.add(bytes((0, 0, 0, 0, a, b, 0, c, d)))
+    return solutions
+
+
+def test_every_solution_of_the_square_is_yielded_once(square_board):
+    puzzle = square_board()
+    solutions = list(iter_solutions(puzzle))
+    assert len(solutions) == len(set(solutions)) == 8
+    assert set(solutions) == brute_force_square((10, 10, 10, 10))
+    for values in solutions:
+        board = square_board()
+        board.load_value_buffer(values)
+        assert board.is_complete() and board.is_consistent()
+
+
+def test_stopping_after_the_first_solution_visits_fewer_nodes(square_board):
+    puzzle = square_board()
+    list(iter_solutions(puzzle, CountingAgent))
+    every_solution = CountingAgent.made[-1].nodes
+    first, = itertools.islice(iter_solutions(puzzle, CountingAgent), 1)
+    assert first in brute_force_square((10, 10, 10, 10))
+    assert CountingAgent.made[-1].nodes < every_solution
@@ -0,0 +1,25 @@
+import copy
+
+import pytest
+
+from BackTracking import IntelligentKakuroAgent, KakuroWhiteCell
+from LocalSearch import solve_local
+
+
+@pytest.mark.parametrize("choice", ["1", "2"])
+def test_one_cell_off_grids_are_repaired(choice, sample_board):
+    puzzle = sample_board(choice)
+    solution = IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle)
+    locations = sorted(solution.cell_clues)
+    for seed in range(20):
+        grid = copy.deepcopy(solution)
+        row, col = locations[seed * 7 % len(locations)]
+        grid.puzzle[row][col].value = grid.puzzle[row][col].value % 9 + 1
+        repaired, _ = solve_local(grid, max_steps=10000, seed=seed)
+        assert repaired is not None and repaired.is_consistent(), (row, col, seed)
+
+
+def test_entries_that_break_a_clue_are_repaired(square_board):
+    puzzle = square_board(KakuroWhiteCell((1, 1), 3, given=False), KakuroWhiteCell((1, 2), 3, given=False))
+    solution, _ = solve_local(puzzle, seed=1)
+    assert solution.is_complete() and solution.is_consistent()
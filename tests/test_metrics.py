@@ -0,0 +1,105 @@
+import urllib.request
+
+import pytest
+
+from BackTracking import IntelligentKakuroAgent
+from Metrics import CONTENT_TYPE, KakuroMetricsRegistry, KakuroSolverMetrics
+
+
+def test_counter_and_gauge_exposition():
+    registry = KakuroMetricsRegistry()
+    solves = registry.counter("kakuro_solves_total", "Finished solves.", ("agent",))
+    solves.labels("intelligent").inc()
+    solves.labels(agent="intelligent").inc(2)
+    solves.labels('odd "name"\n').inc()
+    active = registry.gauge("kakuro_active_solves", "Solves running.")
+    active.labels().inc(3)
+    active.labels().dec()
+    assert registry.render() == "\n".join([
+        "# HELP kakuro_solves_total Finished solves.",
+        "# TYPE kakuro_solves_total counter",
+        'kakuro_solves_total{agent="intelligent"} 3',
+        'kakuro_solves_total{agent="odd \\"name\\"\\n"} 1',
+        "# HELP kakuro_active_solves Solves running.",
+        "# TYPE kakuro_active_solves gauge",
+        "kakuro_active_solves 2",
+    ]) + "\n"
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = KakuroMetricsRegistry()
+    latency = registry.histogram("kakuro_solve_duration_seconds", "Time per solve.", buckets=(0.5, 0.1, 1))
+    for value in (0.05, 0.2, 0.3, 5.0):
+        latency.labels().observe(value)
+    assert registry.render().splitlines()[2:] == [
+        'kakuro_solve_duration_seconds_bucket{le="0.1"} 1',
+        'kakuro_solve_duration_seconds_bucket{le="0.5"} 3',
+        'kakuro_solve_duration_seconds_bucket{le="1"} 3',
+        'kakuro_solve_duration_seconds_bucket{le="+Inf"} 4',
+        'kakuro_solve_duration_seconds_sum 5.55',
+        'kakuro_solve_duration_seconds_count 4',
+    ]
+
+
+def test_registry_rejects_misuse():
+    registry = KakuroMetricsRegistry()
+    counter = registry.counter("kakuro_nodes_total", "Nodes.", ("agent",))
+    assert registry.counter("kakuro_nodes_total", "Nodes.", ("agent",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("kakuro_nodes_total", "Nodes.", ("agent",))
+    with pytest.raises(ValueError):
+        counter.labels("intelligent", "4x4")
+    with pytest.raises(ValueError):
+        counter.labels("intelligent").inc(-1)
+
+
+def test_solver_metrics_record_each_solve(sample_board, tmp_path):
+    puzzle = sample_board("4")
+    metrics = KakuroSolverMetrics()
+    solution = metrics.solve(puzzle)
+    assert solution is not None and solution.is_complete() and solution.is_consistent()
+    assert metrics.solve(puzzle, time_budget=0) is None
+
+    labels = ("IntelligentKakuroAgent", "10x10")
+    agent = IntelligentKakuroAgent(puzzle, verbose=False)
+    agent.backtracking_search(puzzle)
+    assert metrics.solves.labels(*(labels + ("solved",))).value == 1
+    assert metrics.solves.labels(*(labels + ("timeout",))).value == 1
+    assert metrics.timeouts.labels(*labels).value == 1
+    assert metrics.nodes.labels(*labels).value == agent.nodes
+    assert metrics.latency.labels(*labels).count == 2
+    assert metrics.active.labels(*labels).value == 0
+
+    path = str(tmp_path / "kakuro.prom")
+    metrics.registry.write(path)
+    with open(path) as metrics_file:
+        assert metrics_file.read() == metrics.registry.render()
+
+
+class BrokenAgent(IntelligentKakuroAgent):
+    def select_unassigned_clue(self, assignment):
+        raise RuntimeError("broken agent")
+
+
+def test_a_solve_that_raises_is_recorded_as_failed(sample_board):
+    metrics = KakuroSolverMetrics()
+    with pytest.raises(RuntimeError, match="broken agent"):
+        metrics.solve(sample_board("1"), BrokenAgent)
+    labels = ("BrokenAgent", "8x8")
+    assert metrics.solves.labels(*(labels + ("failed",))).value == 1
+    assert metrics.latency.labels(*labels).count == 1
+    assert metrics.active.labels(*labels).value == 0
+
+
+def test_serve_answers_with_the_exposition():
+    registry = KakuroMetricsRegistry()
+    registry.counter("kakuro_solves_total", "Finished solves.").labels().inc()
+    server = registry.serve(port=0)
+    try:
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert response.read().decode("utf-8") == registry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
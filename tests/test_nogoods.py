@@ -0,0 +1,76 @@
+import copy
+
+import pytest
+
+from BackTracking import EXHAUSTED, IntelligentKakuroAgent, KakuroAgent, KakuroSearch
+
+AGENTS = [KakuroAgent, IntelligentKakuroAgent]
+# the rows of a square whose columns sum to 10 sum to 10 as well, so this one has no solution
+UNSOLVABLE = (10, 10, 10, 11)
+
+
+class ReasonRecorder:
+    # collects why the search left each value set or frame
+    def __init__(self):
+        self.reasons = []
+
+    def push(self, depth, clue):
+        pass
+
+    def try_value_set(self, depth, clue, tried):
+        pass
+
+    def prune(self, depth, clue, tried, reason):
+        self.reasons.append(reason)
+
+    def backtrack(self, depth, clue, reason):
+        self.reasons.append(reason)
+
+    def solved(self, depth):
+        pass
+
+
+def nodes_to_exhaust(agent_class, puzzle):
+    agent = agent_class(puzzle, verbose=False)
+    assert agent.backtracking_search(puzzle) is None
+    return agent.nodes
+
+
+@pytest.mark.parametrize("agent_class", AGENTS)
+def test_a_failure_backjumps_over_an_unrelated_clue(agent_class, square_board, square_row):
+    puzzle = square_row((10, 10, 10, 10), UNSOLVABLE)
+    search = KakuroSearch(agent_class(puzzle, verbose=False), copy.deepcopy(puzzle))
+    search.trace = ReasonRecorder()
+    assert search.run() == EXHAUSTED
+    assert 'backjump' in search.trace.reasons
+    # the left square is filled once instead of once for each of its eight solutions
+    left = agent_class(square_board(), verbose=False)
+    left.backtracking_search(square_board())
+    assert search.agent.nodes <= left.nodes + nodes_to_exhaust(agent_class, square_board(sums=UNSOLVABLE))
+
+
+@pytest.mark.parametrize("agent_class", AGENTS)
+def test_nogoods_are_kept_for_another_run_on_the_same_puzzle(agent_class, square_board):
+    puzzle = square_board(sums=UNSOLVABLE)
+    agent = agent_class(puzzle, verbose=False)
+    assert agent.backtracking_search(puzzle) is None
+    learned = len(agent.nogoods)
+    first_nodes = agent.nodes
+    assert learned > 0
+
+    agent.nodes = 0
+    assert agent.backtracking_search(puzzle) is None
+    assert len(agent.nogoods) == learned
+    assert agent.nogoods.hits > 0
+    assert agent.nodes < first_nodes
+
+
+@pytest.mark.parametrize("agent_class", AGENTS)
+def test_nogoods_of_another_puzzle_do_not_prune_a_reused_agent(agent_class, square_board):
+    unsolvable = square_board(sums=UNSOLVABLE)
+    agent = agent_class(unsolvable, verbose=False)
+    assert agent.backtracking_search(unsolvable) is None
+    # both solutions of this square put 1, 9 or 2, 8 down the left column, which the first search ruled out
+    puzzle = square_board(sums=(10, 5, 3, 12))
+    solution = agent.backtracking_search(puzzle)
+    assert solution is not None and solution.is_complete() and solution.is_consistent()
@@ -0,0 +1,68 @@
+import random
+import timeit
+
+import pytest
+
+from BackTracking import IntelligentKakuroAgent, KakuroAgent
+from Discrepancy import LeastConstrainingKakuroAgent
+from Restarts import RandomizedKakuroAgent
+
+AGENTS = {
+    "backtracking": KakuroAgent,
+    "intelligent": IntelligentKakuroAgent,
+    "least-constraining": LeastConstrainingKakuroAgent,
+    "randomized": lambda puzzle, verbose: RandomizedKakuroAgent(puzzle, verbose, rng=random.Random(0)),
+}
+BOARDS = ["1", "2", "3", "4"]
+TIMING_RUNS = 3
+
+
+def calibration_seconds():
+    # a fixed pure Python workload, timings are stored as multiples of it to factor out the machine
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        return total
+    return min(timeit.repeat(workload, number=1, repeat=5))
+
+
+@pytest.fixture(scope="session")
+def calibration():
+    return calibration_seconds()
+
+
+def solve(agent_factory, puzzle):
+    agent = agent_factory(puzzle, verbose=False)
+    start = timeit.default_timer()
+    solution = agent.backtracking_search(puzzle)
+    return solution, agent.nodes, timeit.default_timer() - start
+
+
+@pytest.mark.parametrize("board", BOARDS)
+@pytest.mark.parametrize("agent_name", sorted(AGENTS))
+def test_solve_against_baseline(agent_name, board, baselines, calibration, sample_board):
+    puzzle = sample_board(board)
+    solution, nodes, elapsed = solve(AGENTS[agent_name], puzzle)
+    assert solution is not None
+    assert solution.is_complete() and solution.is_consistent()
+    for _ in range(TIMING_RUNS - 1):
+        elapsed = min(elapsed, solve(AGENTS[agent_name], puzzle)[2])
+
+    name = "%s-board-%s" % (agent_name, board)
+    result = {"nodes": nodes, "solution": solution.value_buffer().hex(),
+              "normalized_time": round(elapsed / calibration, 3)}
+    if baselines.update:
+        baselines.record(name, result)
+        return
+
+    baseline = baselines.case(name)
+    if baseline is None:
+        pytest.skip("no baseline for %s, run pytest --update-baselines" % name)
+    assert result["solution"] == baseline["solution"]
+    # node counts are deterministic, any growth beyond the tolerance is an algorithmic regression
+    assert nodes <= baseline["nodes"] * (1 + baselines.data["node_tolerance"]), \
+        "%s took %d nodes, baseline %d" % (name, nodes, baseline["nodes"])
+    assert result["normalized_time"] <= baseline["normalized_time"] * baselines.data["time_tolerance"], \
+        "%s took %.3f calibration units, baseline %.3f" % (name, result["normalized_time"],
+                                                          baseline["normalized_time"])
@@ -0,0 +1,85 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+import BackTracking
+from Portfolio import SOLVED, STRATEGIES, best_strategies, solve_portfolio
+
+# set by the tests before the strategy processes fork
+pid_path = None
+
+
+class SleepingAgent(BackTracking.KakuroAgent):
+    # leaves its pid behind and then never finishes, only terminate() ends it
+    def backtracking_search(self, puzzle):
+        with open(pid_path + ".tmp", "w") as pid_file:
+            pid_file.write(str(os.getpid()))
+        os.replace(pid_path + ".tmp", pid_path)
+        time.sleep(60)
+
+
+class BrokenAgent(BackTracking.KakuroAgent):
+    def backtracking_search(self, puzzle):
+        raise RuntimeError("broken strategy")
+
+
+class LateAgent(BackTracking.IntelligentKakuroAgent):
+    # solves only once the sleeper is running, so there is a loser to terminate
+    def backtracking_search(self, puzzle):
+        deadline = time.monotonic() + 10
+        while not os.path.exists(pid_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return super().backtracking_search(puzzle)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_race_returns_a_valid_solution(sample_board, tmp_path):
+    log_path = str(tmp_path / "portfolio.log")
+    puzzle = sample_board("4")
+    result = solve_portfolio(puzzle, timeout=60, log_path=log_path)
+    assert result.winner in STRATEGIES and result.status == SOLVED
+    assert result.solution.is_complete() and result.solution.is_consistent()
+    assert best_strategies(log_path) == {"10x10": result.winner}
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the patched strategies only reach forked processes")
+@pytest.mark.parametrize("strategies, timeout", [(["sleeper", "late"], 60), (["sleeper"], 2)])
+def test_losers_are_terminated(strategies, timeout, sample_board, monkeypatch, tmp_path):
+    monkeypatch.setitem(STRATEGIES, "sleeper", SleepingAgent)
+    monkeypatch.setitem(STRATEGIES, "late", LateAgent)
+    monkeypatch.setattr(sys.modules[__name__], "pid_path", str(tmp_path / "sleeper.pid"))
+    result = solve_portfolio(sample_board("1"), strategies, timeout=timeout)
+    if "late" in strategies:
+        assert result.winner == "late" and result.solution.is_consistent()
+    else:
+        assert result.winner is None
+    with open(str(tmp_path / "sleeper.pid")) as pid_file:
+        assert not is_running(int(pid_file.read()))
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the patched strategies only reach forked processes")
+@pytest.mark.parametrize("strategies, timeout, message", [(["broken"], 60, "no strategy solved 8x8 (broken failed)"),
+                                                          (["sleeper"], 1, "portfolio timed out on 8x8")])
+def test_the_log_tells_a_timeout_from_failed_strategies(strategies, timeout, message, sample_board, monkeypatch,
+                                                         tmp_path, caplog):
+    monkeypatch.setitem(STRATEGIES, "broken", BrokenAgent)
+    monkeypatch.setitem(STRATEGIES, "sleeper", SleepingAgent)
+    monkeypatch.setattr(sys.modules[__name__], "pid_path", str(tmp_path / "sleeper.pid"))
+    with caplog.at_level(logging.INFO, logger="Portfolio"):
+        result = solve_portfolio(sample_board("1"), strategies, timeout=timeout)
+    assert result.winner is None
+    messages = [record.getMessage() for record in caplog.records if record.name == "Portfolio"]
+    assert any(message in text for text in messages)
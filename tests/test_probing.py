@@ -0,0 +1,35 @@
+from Probing import KakuroProber, solve_with_probing
+from Propagation import POPCOUNT, default_rules, subset_rules
+
+
+def test_parallel_probing_counts_each_digit_once(sample_board):
+    puzzle = sample_board("4")
+    results = []
+    for workers in (None, 2):
+        prober = KakuroProber(puzzle)
+        before = sum(POPCOUNT[mask] for mask in prober.propagator.domains)
+        assert prober.probe(workers=workers)
+        after = sum(POPCOUNT[mask] for mask in prober.propagator.domains)
+        assert prober.removed == before - after
+        results.append((prober.removed, prober.propagator.domains))
+    assert results[0] == results[1]
+
+
+def test_workers_probe_with_the_prober_rules(sample_board):
+    # chunks are probed against the domains at the start of a round, so they make at least the sequential probes
+    puzzle = sample_board("4")
+    results = []
+    for workers in (None, 2):
+        rules = default_rules() + subset_rules()
+        prober = KakuroProber(puzzle, rules)
+        assert prober.probe(workers=workers)
+        results.append((prober.propagator.domains, [rule.calls for rule in rules]))
+    assert results[0][0] == results[1][0]
+    assert all(parallel >= sequential for sequential, parallel in zip(results[0][1], results[1][1]))
+
+
+def test_probing_hands_its_rules_to_the_agent(sample_board):
+    rules = default_rules() + subset_rules()
+    solution, prober, agent = solve_with_probing(sample_board("4"), rules=rules)
+    assert solution.is_complete() and solution.is_consistent()
+    assert agent.rules is rules and prober.propagator.rules is rules
@@ -0,0 +1,73 @@
+import os
+import pstats
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from BackTracking import KakuroAgent
+from Profiling import KEY_FUNCTIONS, profile_solve
+
+SOLVER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tables(summary):
+    # the rows under each heading of the summary, without the column header
+    sections = {}
+    for block in summary.strip().split("\n\n")[1:]:
+        lines = block.split("\n")
+        sections[lines[0]] = lines[2:]
+    return sections
+
+
+def check_profile(prefix, top):
+    functions = {function for _, _, function in pstats.Stats(prefix + ".pstats").stats}
+    assert "order_domain_values" in functions
+    with open(prefix + ".txt") as summary_file:
+        summary = summary_file.read()
+    sections = tables(summary)
+    assert list(sections) == ["solver functions", "allocations still held, by solver function",
+                              "top allocation sites"]
+    for rows in sections.values():
+        assert 0 < len(rows) <= top
+    return summary, sections
+
+
+def test_profile_solve_writes_the_stats_and_the_summary(sample_board, tmp_path, capsys):
+    prefix = str(tmp_path / "profile")
+    solution = profile_solve(sample_board("2"), KakuroAgent, prefix, top=3)
+    assert solution.is_complete() and solution.is_consistent()
+    summary, sections = check_profile(prefix, 3)
+    assert summary.startswith("KakuroAgent on a 8x8 board: solved")
+    # the key functions are listed ahead of the rest
+    assert sections["solver functions"][0].endswith(".order_domain_values")
+    assert any(row.endswith("." + name) for row in sections["solver functions"] for name in KEY_FUNCTIONS[1:])
+    assert capsys.readouterr().out.strip() == summary.strip()
+
+
+class FailingAgent(KakuroAgent):
+    def backtracking_search(self, puzzle):
+        raise RuntimeError("solve failed")
+
+
+def test_a_failed_solve_stops_the_profiler(sample_board, tmp_path):
+    with pytest.raises(RuntimeError):
+        profile_solve(sample_board("2"), FailingAgent, str(tmp_path / "profile"))
+    assert sys.getprofile() is None
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_flag_of_the_command_line(tmp_path):
+    prefix = str(tmp_path / "cli")
+    completed = subprocess.run([sys.executable, os.path.join(SOLVER_DIRECTORY, "BackTracking.py"), "--board", "1",
+                                "--profile", "--agent", "backtracking", "--output", prefix, "--top", "5"],
+                               cwd=str(tmp_path), capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    summary, _ = check_profile(prefix, 5)
+    assert summary.strip() in completed.stdout
+
+    completed = subprocess.run([sys.executable, os.path.join(SOLVER_DIRECTORY, "BackTracking.py"), "--board", "1",
+                                "--profile", "--agent", "nonsense"], cwd=str(tmp_path), capture_output=True, text=True,
+                               timeout=120)
+    assert completed.returncode != 0 and "unknown agent nonsense" in completed.stderr
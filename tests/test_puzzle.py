@@ -0,0 +1,131 @@
+import copy
+import pickle
+import random
+from itertools import combinations
+
+import pytest
+
+from BackTracking import (ALL_DIGITS, CLUE_DIGITS, CROSSING_DIGITS, DIGITS, DOWN, RIGHT, WHITE, IntelligentKakuroAgent,
+                          KakuroAgent, KakuroBlackCell, KakuroClue, KakuroClueCell, KakuroPuzzle, KakuroSearch,
+                          KakuroWhiteCell, iter_solutions)
+
+
+def scanned_remaining(puzzle, clue):
+    values = [cell.value for cell in puzzle.get_cell_set(clue) if cell.value != 0]
+    if len(set(values)) != len(values):
+        return None
+    used = 0
+    for value in values:
+        used |= 1 << value
+    return clue.goal_sum - sum(values), clue.length - len(values), ALL_DIGITS & ~used
+
+
+def test_clue_counters_follow_every_write(sample_board):
+    rng = random.Random(1)
+    puzzle = sample_board("4")
+    for step in range(3000):
+        if step % 500 == 0:
+            puzzle = copy.deepcopy(puzzle) if step % 1000 else pickle.loads(pickle.dumps(puzzle))
+            cells = [puzzle.puzzle[row][col] for row, col in puzzle.cell_clues]
+        rng.choice(cells).value = rng.choice([0] + DIGITS)
+        for clue in puzzle.clues:
+            remaining = puzzle.clue_remaining(clue)
+            expected = scanned_remaining(puzzle, clue)
+            if expected is None:
+                assert remaining[2] is None
+            else:
+                assert remaining == expected
+
+
+def clashing_singletons_board():
+    # both down clues force a 1, the right clue across them needs 1 and 2
+    cells = [KakuroBlackCell((0, 0)),
+             KakuroClueCell((0, 1), KakuroClue(DOWN, 1, 1), None),
+             KakuroClueCell((0, 2), KakuroClue(DOWN, 1, 1), None),
+             KakuroClueCell((1, 0), None, KakuroClue(RIGHT, 2, 3))]
+    return KakuroPuzzle(2, 3, cells, verbose=False)
+
+
+@pytest.mark.parametrize("agent_class", [KakuroAgent, IntelligentKakuroAgent])
+def test_clashing_seeded_cells_fail_the_search(agent_class):
+    puzzle = clashing_singletons_board()
+    search = KakuroSearch(agent_class(puzzle, verbose=False), copy.deepcopy(puzzle))
+    assert search.failed
+    assert agent_class(puzzle, verbose=False).backtracking_search(puzzle) is None
+    assert list(iter_solutions(puzzle, agent_class)) == []
+
+
+def test_select_unassigned_clue_on_a_full_grid():
+    puzzle = clashing_singletons_board()
+    for row, col in puzzle.cell_clues:
+        puzzle.puzzle[row][col].value = 1
+    assert IntelligentKakuroAgent(puzzle, verbose=False).select_unassigned_clue(puzzle) is None
+
+
+def test_puzzles_built_from_the_same_clue_cells_stay_apart(sample_board):
+    puzzle = sample_board("4")
+    expected = IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle).value_buffer()
+    cells = [cell for row in puzzle.puzzle for cell in row if cell.category != WHITE]
+    other = KakuroPuzzle(10, 10, cells + [KakuroWhiteCell((1, 3), 9)], verbose=False)
+    assert puzzle.clue_remaining(puzzle.clues[0]) == (17, 2, ALL_DIGITS)
+    assert other.clue_remaining(other.clues[0]) == (8, 1, ALL_DIGITS & ~(1 << 9))
+    assert IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle).value_buffer() == expected
+    assert IntelligentKakuroAgent(other, verbose=False).backtracking_search(other).is_consistent()
+
+
+def row_board(width, clue, *cells):
+    # a single row with the clue at its left end, every cell not given is white
+    return KakuroPuzzle(1, width, [KakuroClueCell((0, 0), None, clue)] + list(cells), verbose=False)
+
+
+def test_a_missing_length_is_derived_from_the_run():
+    puzzle = row_board(3, KakuroClue(RIGHT, None, 3))
+    assert puzzle.clues[0].length == 2
+    assert [puzzle.puzzle[0][col].domain for col in (1, 2)] == [0b110, 0b110]
+
+
+@pytest.mark.parametrize("width, clue, cells, message", [
+    (3, KakuroClue(RIGHT, 3, 6), [], "has length 3 but its run has 2 cells"),
+    (11, KakuroClue(RIGHT, None, 45), [], "heads a run of 10 cells"),
+    (2, KakuroClue(RIGHT, None, 3), [KakuroBlackCell((0, 1))], "heads a run of 0 cells"),
+    (3, KakuroClue(RIGHT, None, 2), [], "no 2 distinct digits sum to 2"),
+])
+def test_boards_that_do_not_fit_their_clues_are_rejected(width, clue, cells, message):
+    with pytest.raises(ValueError, match=message):
+        row_board(width, clue, *cells)
+
+
+def test_a_white_cell_without_a_clue_is_rejected():
+    # the clue covers the top row, the white cell in the corner below is in no run
+    cells = [KakuroClueCell((0, 0), None, KakuroClue(RIGHT, None, 3)), KakuroBlackCell((1, 0)), KakuroBlackCell((1, 1))]
+    with pytest.raises(ValueError, match=r"white cell at \(1, 2\) is not covered by any clue"):
+        KakuroPuzzle(2, 3, cells, verbose=False)
+
+
+def direct_clue_digits(goal_sum, length):
+    # every digit in some set of distinct digits with the sum, found by trying all of them
+    mask = 0
+    for digits in combinations(DIGITS, length):
+        if sum(digits) == goal_sum:
+            for digit in digits:
+                mask |= 1 << digit
+    return mask
+
+
+def test_digit_tables_match_a_direct_count():
+    direct = {(goal_sum, length): direct_clue_digits(goal_sum, length)
+              for length in range(1, 10) for goal_sum in range(1, 46)}
+    assert CLUE_DIGITS == {key: mask for key, mask in direct.items() if mask}
+    for first in CLUE_DIGITS:
+        for second in CLUE_DIGITS:
+            assert CROSSING_DIGITS[(first, second)] == direct[first] & direct[second]
+
+
+@pytest.mark.parametrize("choice", ["1", "2", "3", "4"])
+def test_seeded_domains_match_the_clues_they_sit_in(choice, sample_board):
+    puzzle = sample_board(choice)
+    for (row, col), clues in puzzle.cell_clues.items():
+        expected = ALL_DIGITS
+        for clue in clues:
+            expected &= direct_clue_digits(clue.goal_sum, clue.length)
+        assert puzzle.puzzle[row][col].domain == expected
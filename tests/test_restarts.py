@@ -0,0 +1,41 @@
+from itertools import islice
+
+import pytest
+
+from Restarts import geometric_schedule, luby, luby_schedule, solve_with_restarts
+
+
+def test_luby_prefix():
+    assert [luby(i) for i in range(1, 16)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    assert list(islice(luby_schedule(100), 7)) == [100, 100, 200, 100, 100, 200, 400]
+
+
+def test_geometric_schedule():
+    assert list(islice(geometric_schedule(10), 5)) == [10, 15, 22, 33, 50]
+    assert list(islice(geometric_schedule(10, factor=2), 4)) == [10, 20, 40, 80]
+
+
+@pytest.mark.parametrize("schedule", ["luby", "geometric"])
+def test_a_fixed_seed_repeats_the_run(schedule, sample_board):
+    puzzle = sample_board("4")
+    first, first_stats = solve_with_restarts(puzzle, schedule, base=5, seed=7)
+    second, second_stats = solve_with_restarts(puzzle, schedule, base=5, seed=7)
+    assert first.is_complete() and first.is_consistent()
+    assert first.value_buffer() == second.value_buffer()
+    assert first_stats == second_stats
+
+
+def test_a_run_restarts_at_its_node_limit(sample_board):
+    puzzle = sample_board("4")
+    solution, stats = solve_with_restarts(puzzle, base=1, seed=1, max_restarts=0)
+    assert solution is None
+    assert stats["restarts"] == 0 and stats["nodes"] == 1
+
+    # the luby limits with a base of 1 start 1, 1, 2
+    solution, stats = solve_with_restarts(puzzle, base=1, seed=1, max_restarts=2)
+    assert solution is None
+    assert stats["restarts"] == 2 and stats["nodes"] == 4
+
+    solution, stats = solve_with_restarts(puzzle, base=1, seed=1)
+    assert stats["restarts"] > 0
+    assert solution.is_complete() and solution.is_consistent()
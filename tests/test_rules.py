@@ -0,0 +1,46 @@
+import pytest
+
+from BackTracking import IntelligentKakuroAgent, KakuroAgent, iter_solutions
+from Decomposition import KakuroDecomposition
+from Propagation import default_rules, subset_rules
+from Session import KakuroSession
+
+
+@pytest.fixture(scope="module")
+def board(sample_board):
+    return sample_board("3")
+
+
+def rule_calls(rules):
+    return {rule.name: rule.calls for rule in rules}
+
+
+@pytest.mark.parametrize("agent_class", [KakuroAgent, IntelligentKakuroAgent])
+def test_agents_run_their_rules_before_the_search(board, agent_class):
+    plain = agent_class(board, verbose=False)
+    expected = plain.backtracking_search(board).value_buffer()
+
+    rules = default_rules() + subset_rules()
+    agent = agent_class(board, verbose=False, rules=rules)
+    assert agent.backtracking_search(board).value_buffer() == expected
+    assert all(calls > 0 for calls in rule_calls(rules).values())
+    assert agent.nodes <= plain.nodes
+
+
+def test_iter_solutions_takes_rules(board):
+    rules = default_rules() + subset_rules()
+    assert list(iter_solutions(board, rules=rules)) == list(iter_solutions(board))
+    assert all(calls > 0 for calls in rule_calls(rules).values())
+
+
+def test_session_and_decomposition_take_rules(board):
+    rules = default_rules() + subset_rules()
+    session = KakuroSession(board, rules=rules)
+    assert session.propagator.rules is rules
+    assert session.is_solvable()
+
+    rules = default_rules() + subset_rules()
+    decomposition = KakuroDecomposition(board, rules=rules)
+    assert decomposition.propagator.rules is rules
+    assert decomposition.solve() is not None
+    assert all(calls > 0 for calls in rule_calls(rules).values())
@@ -0,0 +1,59 @@
+import copy
+import random
+import sys
+
+import pytest
+
+from BackTracking import (DOWN, PAUSED, RIGHT, SOLVED, IntelligentKakuroAgent, KakuroAgent, KakuroBlackCell, KakuroClue,
+                          KakuroClueCell, KakuroPuzzle, KakuroSearch)
+
+
+def lattice_board(size, seed):
+    # 4x4 blocks of white cells between black rows and columns at every fifth line, each block filled with a
+    # latin square of four random digits so the board has a solution
+    rng = random.Random(seed)
+    values = {}
+    for top in range(1, size, 5):
+        for left in range(1, size, 5):
+            digits = rng.sample(range(1, 10), 4)
+            shift = rng.randrange(4)
+            for row in range(4):
+                for col in range(4):
+                    values[(top + row, left + col)] = digits[(row + col + shift) % 4]
+    cells = []
+    for row in range(size):
+        for col in range(size):
+            if (row, col) in values:
+                continue
+            down = right = None
+            if (row + 1, col) in values:
+                down = KakuroClue(DOWN, 4, sum(values[(row + offset, col)] for offset in range(1, 5)))
+            if (row, col + 1) in values:
+                right = KakuroClue(RIGHT, 4, sum(values[(row, col + offset)] for offset in range(1, 5)))
+            cells.append(KakuroClueCell((row, col), down, right) if down or right else KakuroBlackCell((row, col)))
+    return KakuroPuzzle(size, size, cells, verbose=False)
+
+
+@pytest.mark.parametrize("agent_class", [KakuroAgent, IntelligentKakuroAgent])
+def test_a_40x40_board_runs_within_the_default_recursion_limit(agent_class):
+    puzzle = lattice_board(40, 1)
+    limit = sys.getrecursionlimit()
+    search = KakuroSearch(agent_class(puzzle, verbose=False), copy.deepcopy(puzzle))
+    status = search.run(max_nodes=3000)
+    assert status in (PAUSED, SOLVED)
+    assert sys.getrecursionlimit() == limit
+    if status == SOLVED:
+        assert search.assignment.is_complete() and search.assignment.is_consistent()
+        # one frame per clue that was still open, far more than recursion could have held
+        assert len(search.stack) > 200
+
+
+def test_a_paused_40x40_search_resumes_to_the_same_solution():
+    puzzle = lattice_board(40, 2)
+    uninterrupted = KakuroSearch(IntelligentKakuroAgent(puzzle, verbose=False), copy.deepcopy(puzzle))
+    assert uninterrupted.run() == SOLVED
+    paused = KakuroSearch(IntelligentKakuroAgent(puzzle, verbose=False), copy.deepcopy(puzzle))
+    while paused.run(max_nodes=50) == PAUSED:
+        pass
+    assert paused.status == SOLVED
+    assert paused.assignment.value_buffer() == uninterrupted.assignment.value_buffer()
@@ -0,0 +1,47 @@
+import copy
+import random
+
+import pytest
+
+from BackTracking import DIGITS, RIGHT, IntelligentKakuroAgent, KakuroWhiteCell
+from Session import KakuroSession
+
+
+def test_a_cleared_given_is_loosened_again(square_board):
+    session = KakuroSession(square_board(KakuroWhiteCell((1, 1), 1)))
+    assert session.candidates((2, 2)) == [1]
+    session.clear_value((1, 1))
+    assert session.candidates((1, 1)) == [1, 2, 3, 4, 6, 7, 8, 9]
+    session.set_value((1, 1), 2)
+    assert session.conflicts() == []
+    assert session.is_solvable()
+    assert session.solution()[(2, 2)] == 2
+
+
+def test_entries_that_break_a_clue_reach_the_session(square_board):
+    with pytest.raises(ValueError):
+        square_board(KakuroWhiteCell((1, 1), 3), KakuroWhiteCell((1, 2), 3))
+    puzzle = square_board(KakuroWhiteCell((1, 1), 3, given=False), KakuroWhiteCell((1, 2), 3, given=False))
+    assert puzzle.givens == set()
+    session = KakuroSession(puzzle)
+    assert [(clue.direction, clue.location) for clue in session.conflicts()] == [(RIGHT, (1, 0))]
+    assert not session.is_solvable()
+
+
+def test_edits_match_a_session_built_from_scratch(sample_board):
+    rng = random.Random(3)
+    puzzle = sample_board("4")
+    solution = IntelligentKakuroAgent(puzzle, verbose=False).backtracking_search(puzzle)
+    session = KakuroSession(copy.deepcopy(puzzle))
+    locations = list(session.constraints.cells)
+    for step in range(400):
+        row, col = rng.choice(locations)
+        if rng.random() < 0.6:
+            session.clear_value((row, col))
+        else:
+            right = solution.puzzle[row][col].value
+            session.set_value((row, col), right if rng.random() < 0.95 else rng.choice(DIGITS))
+        fresh = KakuroSession(copy.deepcopy(session.puzzle))
+        assert session.is_solvable() == fresh.is_solvable()
+        if not fresh.blocked:
+            assert session.propagator.domains == fresh.propagator.domains
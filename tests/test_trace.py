@@ -0,0 +1,52 @@
+import copy
+
+import pytest
+
+from BackTracking import SOLVED, IntelligentKakuroAgent, KakuroSearch
+from Trace import (PRUNE, PUSH, REASONS, TRACE_HEADER, TRACE_MAGIC, TRACE_RECORD, TRACE_VERSION, TRY,
+                   KakuroTraceAnalyzer, KakuroTraceRecorder, read_trace, record_search)
+
+
+@pytest.fixture(scope="module")
+def board(sample_board):
+    return sample_board("4")
+
+
+def test_records_roundtrip_with_large_tried_counts(board, tmp_path):
+    path = str(tmp_path / "search.trace")
+    search = KakuroSearch(IntelligentKakuroAgent(board, verbose=False), copy.deepcopy(board))
+    clue = search.assignment.clues[1]
+    with KakuroTraceRecorder(path, buffer_records=2) as recorder:
+        recorder.attach(search)
+        recorder.push(0, clue)
+        recorder.try_value_set(0, clue, 362880)
+        recorder.prune(0, clue, 70000, 'nogood')
+    assert list(read_trace(path)) == [(PUSH, 0, 0, 1, 0, 0), (TRY, 0, 0, 1, 0, 362880),
+                                      (PRUNE, REASONS['nogood'], 0, 1, 0, 70000)]
+    assert search.trace is None
+
+
+def test_recorded_search_is_deterministic_and_analyzable(board, tmp_path):
+    first = str(tmp_path / "first.trace")
+    second = str(tmp_path / "second.trace")
+    status, solution = record_search(board, first, buffer_records=16)
+    assert status == SOLVED and solution.is_complete() and solution.is_consistent()
+    record_search(board, second)
+    with open(first, 'rb') as first_file, open(second, 'rb') as second_file:
+        assert first_file.read() == second_file.read()
+
+    records = list(read_trace(first))
+    analyzer = KakuroTraceAnalyzer(first)
+    assert len(analyzer.frames) == sum(1 for record in records if record[0] == PUSH)
+    assert len(analyzer.solutions) == 1
+    levels = analyzer.branching()
+    assert sum(level['tries'] for level in levels.values()) == sum(1 for record in records if record[0] == TRY)
+    assert analyzer.expensive_subtrees(1)[0].depth == 0
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = str(tmp_path / "other.trace")
+    with open(path, 'wb') as trace_file:
+        trace_file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION + 1, TRACE_RECORD.size))
+    with pytest.raises(ValueError):
+        read_trace(path)
@@ -0,0 +1,70 @@
+import copy
+
+import pytest
+
+from BackTracking import DIGITS, IntelligentKakuroAgent, KakuroAgent
+
+
+def eager_sum_to_n(n, k, allowed_values):
+    # the list-building sum_to_n that order_domain_values used before it became a generator
+    if k == 1 and n in allowed_values:
+        return [[n]]
+    if k < 1:
+        # the old code went on recursing until the sum ran out and found nothing either
+        return []
+    combos = []
+    for i in allowed_values:
+        allowed_values_copy = copy.deepcopy(allowed_values)
+        allowed_values_copy.remove(i)
+        if n - i > 0:
+            combos += [[i] + combo for combo in eager_sum_to_n(n - i, k - 1, allowed_values_copy)]
+    for combo in combos[:]:
+        if any(combo.count(x) > 1 for x in combo):
+            combos.remove(combo)
+    return combos
+
+
+def eager_order(clue, cell_set, assignment):
+    # the eager value sets, less those that put a digit a crossing clue no longer allows into an empty cell
+    allowed_values = [digit for digit in DIGITS if digit not in [cell.value for cell in cell_set]]
+    empty = [cell for cell in cell_set if cell.value == 0]
+    remaining = clue.goal_sum - sum(cell.value for cell in cell_set)
+    value_sets = []
+    for combo in eager_sum_to_n(remaining, len(empty), allowed_values):
+        allowed = True
+        for cell, value in zip(empty, combo):
+            domain = cell.domain
+            for other in assignment.cell_clues[cell.location]:
+                if other is not clue:
+                    domain &= assignment.clue_domain(other)
+            allowed = allowed and bool(domain & (1 << value))
+        if allowed:
+            values = iter(combo)
+            value_sets.append([cell.value or next(values) for cell in cell_set])
+    return value_sets
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4])
+def test_sum_to_n_yields_the_eager_combinations_in_order(k):
+    agent = KakuroAgent.__new__(KakuroAgent)
+    for n in range(1, 46):
+        for allowed_values in (DIGITS, [digit for digit in DIGITS if digit % 3]):
+            assert list(agent.sum_to_n(n, k, allowed_values)) == eager_sum_to_n(n, k, list(allowed_values))
+
+
+@pytest.mark.parametrize("choice", ["1", "2", "3", "4"])
+def test_lazy_order_matches_the_eager_order(choice, sample_board):
+    puzzle = sample_board(choice)
+    agent = IntelligentKakuroAgent(puzzle, verbose=False)
+    # at the root and then with the first value set of each clue in turn placed, as a search would, the eager
+    # order is only built for up to four empty cells
+    for clue in puzzle.clues:
+        for other in puzzle.clues:
+            cell_set = puzzle.get_cell_set(other)
+            if 0 < puzzle.clue_unassigned_count(other) <= 4:
+                assert list(agent.order_domain_values(other, cell_set, puzzle)) == eager_order(other, cell_set, puzzle)
+        cell_set = puzzle.get_cell_set(clue)
+        first = next(iter(agent.order_domain_values(clue, cell_set, puzzle)), None)
+        if first is None:
+            break
+        puzzle.assign_clue(clue, first)